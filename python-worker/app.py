@@ -1,13 +1,21 @@
-from fastapi import FastAPI, Response
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List
+import asyncio
 import logging
 import os
-import json
+import re
+import orjson
+import shutil
 import tempfile
-from extract_text import fetch_and_extract
+from extract_text import fetch_and_extract_batch
 from audio import tts
-from video import assemble_video, get_run_id
+from audio.alignment import _get_align_model, whisperx_device
+from audio.client import client
+from audio.config import TTS_OUTPUT_FORMAT, VOICE_CONFIGS
+from video import assemble_video_isolated, get_run_id, prepare_vertical_backgrounds
 from generate_script import generate_script as generate_script_func
 from generate_script import generate_script_manual as generate_script_manual_func
 
@@ -18,6 +26,57 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="AI Reels Worker")
 
+BG_FOLDER = "/app/background-videos"
+FONT_PATH = "/app/fonts/SuperMalibu-Wp77v.ttf"
+
+# Set WARMUP_ON_STARTUP=0 to skip pre-warming (e.g. local development)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") != "0"
+
+# One "Speaker: text" line; only the first colon separates speaker from text.
+# Horizontal whitespace only, so a blank "Peter:" line can't take the next line.
+_SCRIPT_LINE = re.compile(r"^(Peter|Stewie):[ \t]*(\S.*)$", re.M)
+
+def _warmup():
+    """Load the WhisperX align model and open the ElevenLabs connection."""
+    _get_align_model("en", whisperx_device())
+    voice = VOICE_CONFIGS["peter"]
+    for _ in client.text_to_speech.convert(
+        text="hi",
+        voice_id=voice["voice_id"],
+        model_id=voice["model_id"],
+        output_format=TTS_OUTPUT_FORMAT,
+    ):
+        pass
+
+
+async def _prescale_backgrounds():
+    # Transcoding every background can take minutes, so it runs in the
+    # background instead of holding up startup. This is the only place that
+    # pre-scales all of them; a reel that needs a copy before it is done
+    # waits on that file's lock instead of transcoding it a second time.
+    try:
+        await asyncio.to_thread(prepare_vertical_backgrounds, BG_FOLDER)
+    except Exception as e:
+        logger.warning(f"Pre-scaling backgrounds failed: {e}")
+
+
+# Keeps a reference so the pre-scaling task isn't garbage-collected
+_prescale_task: asyncio.Task | None = None
+
+
+@app.on_event("startup")
+async def warmup():
+    global _prescale_task
+    if not WARMUP_ON_STARTUP:
+        return
+    _prescale_task = asyncio.create_task(_prescale_backgrounds())
+    logger.info("Warming up alignment model and TTS client")
+    try:
+        await asyncio.to_thread(_warmup)
+    except Exception as e:
+        # A failed warmup only costs first-request latency
+        logger.warning(f"Warmup failed: {e}")
+
 class ExtractRequest(BaseModel):
     urls: List[str]
 
@@ -33,6 +92,8 @@ class FormatResponse(BaseModel):
 
 class GenerateVideoRequest(BaseModel):
     script: list[tuple[str, str]] # (speaker, text)
+    title: str = "" # shown at the top of the video; empty for none
+    force_regenerate: bool = False # bypass the TTS cache
 
 
 class GenerateAudioResponse(BaseModel):
@@ -47,32 +108,28 @@ class GenerateScriptResponse(BaseModel):
     script: list[tuple[str, str]] # (speaker, text)
 
 @app.post("/extract", response_model=ExtractResponse)
-def extract(req: ExtractRequest):
+async def extract(req: ExtractRequest):
     logger.info(f"Requesting to extract: {req.urls}")
-    out = []
-    seen = set()
-    for url in req.urls[:10]:  # cap to 10 sources for speed
-        if url in seen:
-            continue
-        seen.add(url)
-        text = fetch_and_extract(url)
-        if text:
-            out.append({"url": url, "text": text})
+    urls = list(dict.fromkeys(req.urls))[:10]  # cap to 10 sources for speed
+    # Fetch all pages concurrently; latency is the slowest page, not the sum
+    texts = await fetch_and_extract_batch(urls)
+    out = [{"url": url, "text": text} for url, text in zip(urls, texts) if text]
     return {"items": out}
 
 @app.post("/format-script", response_model=FormatResponse)
 def format_script(req: FormatRequest):
-    print(req.text)
     """
-    Array: [["Peter", "Hey Lois— I mean, Stewie— did you hear some hackers just let an AI run wild like an angry Roomba?"],["Stewie", "Yes, tubby, but imagine that Roomba also steals your passwords while buffing the hardwood— that's Anthropic's recent nightmare."],["Peter", "So the robot did all the hacking? No little guy in a hoodie eating Cheetos?"]]
+    Split a script of "Speaker: text" lines into each speaker's lines, e.g.
+
+        Peter: Hey Lois— I mean, Stewie— did you hear some hackers just let an AI run wild like an angry Roomba?
+        Stewie: Yes, tubby, but imagine that Roomba also steals your passwords while buffing the hardwood.
+
+    Lines from speakers other than Peter and Stewie, and blank lines, are ignored.
     """
     peter = []
     stewie = []
-    for speaker, text in req.text:
-        if speaker == "Peter":
-            peter.append(text)
-        elif speaker == "Stewie":
-            stewie.append(text)
+    for m in _SCRIPT_LINE.finditer(req.text):
+        (peter if m.group(1) == "Peter" else stewie).append(m.group(2).strip())
     return {"peter": peter, "stewie": stewie}
 
 
@@ -84,7 +141,7 @@ def format_script(req: FormatRequest):
 
 @app.post("/generate-script", response_model=GenerateScriptResponse)
 def generate_script(req: GenerateScriptRequest):
-    title: str, script: list[tuple[str, str]] = generate_script_func(req.text)
+    title, script = generate_script_func(req.text)
     return {"title": title, "script": script}
 
 @app.post("/generate-script-manual", response_model=GenerateScriptResponse)
@@ -93,14 +150,12 @@ def generate_script_manual(req: GenerateScriptRequest):
     return {"script": script}
 
 @app.post("/generate-video")
-def generate_video(req: GenerateVideoRequest):
+async def generate_video(req: GenerateVideoRequest):
     """
     Generate a video with PNG overlays based on speaker timings.
     Returns the final video file as MP4.
     """
     logger.info("Generating video with speaker overlays")
-    # Generate audio with timing information and word alignments
-    audio_bytes, timings, word_alignments = tts(req.script)
 
     # Generate run ID for consistent naming
     run_id = get_run_id()
@@ -109,11 +164,17 @@ def generate_video(req: GenerateVideoRequest):
     output_dir = "/data/out"
     os.makedirs(output_dir, exist_ok=True)
 
-    # Write audio bytes, speaker timings, and word alignments to /data/out
+    # Generate audio with timing information and word alignments; the WAV is
+    # written straight to /data/out. TTS, ffmpeg and WhisperX are blocking, so
+    # run them off the event loop.
     audio_filename = f"{run_id}.wav"
     audio_output_path = os.path.join(output_dir, audio_filename)
-    with open(audio_output_path, "wb") as f:
-        f.write(audio_bytes)
+    _, timings, word_alignments = await asyncio.to_thread(
+        tts,
+        req.script,
+        force_regenerate=req.force_regenerate,
+        out_path=audio_output_path,
+    )
     logger.info(f"Audio saved to {audio_output_path}")
 
     # Write speaker timings as JSON
@@ -124,8 +185,8 @@ def generate_video(req: GenerateVideoRequest):
         "start": start,
         "end": end
     } for speaker, start, end in timings]
-    with open(timings_output_path, "w") as f:
-        json.dump(timings_data, f, indent=2)
+    with open(timings_output_path, "wb") as f:
+        f.write(orjson.dumps(timings_data))
     logger.info(f"Speaker timings saved to {timings_output_path}")
 
     # Write word alignments as JSON
@@ -137,41 +198,39 @@ def generate_video(req: GenerateVideoRequest):
         "start": start,
         "end": end
     } for word, start, end in word_alignments]
-    with open(word_alignments_output_path, "w") as f:
-        json.dump(word_alignments_data, f, indent=2)
+    with open(word_alignments_output_path, "wb") as f:
+        f.write(orjson.dumps(word_alignments_data))
     logger.info(f"Word alignments saved to {word_alignments_output_path}")
 
-    # Create temporary directory for audio file
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Save audio to temporary WAV file
-        audio_path = os.path.join(temp_dir, "dialogue.wav")
-        with open(audio_path, "wb") as f:
-            f.write(audio_bytes)
-
-        # Generate output video path
-        video_filename = f"final-{run_id}.mp4"
-        video_path = os.path.join(temp_dir, video_filename)
-
-        # Assemble video with PNG overlays and word-level captions
-        assemble_video(
-            dialogue_wav_path=audio_path,
-            bg_folder="/app/background-videos",
+    # Create temporary directory for the video file; it is removed once the
+    # response has been sent
+    temp_dir = tempfile.mkdtemp()
+    video_filename = f"final-{run_id}.mp4"
+    video_path = os.path.join(temp_dir, video_filename)
+
+    try:
+        # Assemble video with PNG overlays and word-level captions, in a
+        # worker process so its memory is released when it finishes
+        await asyncio.to_thread(
+            assemble_video_isolated,
+            dialogue_wav=audio_output_path,
+            bg_folder=BG_FOLDER,
             out_path=video_path,
             speaker_timings=timings,
             pngs_folder="/app/pngs",
             word_alignments=word_alignments,
+            font_path=FONT_PATH,
+            title=req.title,
         )
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
 
-        # Read the generated video file
-        with open(video_path, "rb") as f:
-            video_bytes = f.read()
-
-        logger.info(f"Video generated successfully: {video_filename}")
+    logger.info(f"Video generated successfully: {video_filename}")
 
-        # Return video as response
-        return Response(content=video_bytes,
+    # Stream the file from disk instead of loading it into memory
+    return FileResponse(video_path,
                         media_type="video/mp4",
-                        headers={
-                            "Content-Disposition":
-                            f'attachment; filename="{video_filename}"'
-                        })
+                        filename=video_filename,
+                        background=BackgroundTask(shutil.rmtree, temp_dir,
+                                                  ignore_errors=True))
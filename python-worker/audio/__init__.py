@@ -1,62 +1,81 @@
 """
 Audio processing module for text-to-speech generation and word alignment.
 """
-import os
-import tempfile
-from audio.tts import generate_audio_for_speaker
-from audio.processing import combine_to_wav_with_timings
+import asyncio
+from typing import Optional
+from audio.tts import generate_audio_batch
+from audio.processing import combine_with_timings, save_wav
 from audio.alignment import align_with_whisperx
 
 
+def _audio_duration(timings: list[tuple[str, float, float]]) -> float:
+    """Total audio duration: the combined WAV ends where the last line ends."""
+    return timings[-1][2] if timings else 0.0
+
+
+def _line_segments(
+    script: list[tuple[str, str]],
+    timings: list[tuple[str, float, float]]
+) -> list[tuple[str, float, float]]:
+    """Pair each script line's text with its (start, end) in the combined audio."""
+    return [
+        (text, start, end)
+        for (_, text), (_, start, end) in zip(script, timings)
+    ]
+
+
 def tts(
-    script: list[tuple[str, str]]  # (speaker, text)
-) -> tuple[bytes, list[tuple[str, float, float]], list[tuple[str, float, float]]]:
+    script: list[tuple[str, str]],  # (speaker, text)
+    force_regenerate: bool = False,
+    out_path: Optional[str] = None
+) -> tuple[bytes | str, list[tuple[str, float, float]], list[tuple[str, float, float]]]:
     """
     Generate audio from text lines and return both audio bytes, speaker timing information, 
     and word-level alignments.
     
     Args:
         script: List of (speaker, text) tuples where speaker is 'Peter' or 'Stewie'
+        force_regenerate: Bypass the TTS cache and synthesize every line again
+        out_path: If given, write the combined WAV to this path instead of
+            returning the bytes
         
     Returns:
-        Tuple of (audio_bytes, speaker_timings, word_alignments) where:
-        - audio_bytes: Combined WAV audio bytes
+        Tuple of (audio, speaker_timings, word_alignments) where:
+        - audio: Combined WAV audio bytes, or `out_path` when one was given
         - speaker_timings: List of (speaker, start_time, end_time) tuples
         - word_alignments: List of (word, start_time, end_time) tuples
     """
-    audio_segments: list[bytes] = []
-    speakers: list[str] = []
+    # Synthesize each distinct (speaker, text) pair only once; repeated lines
+    # reuse the same audio.
+    unique: dict[tuple[str, str], tuple[bytes, int, int, str]] = dict.fromkeys(
+        (speaker, text) for speaker, text in script
+    )
 
-    # Build combined transcript for WhisperX alignment
-    transcript_parts: list[str] = []
+    # Synthesize all lines concurrently; the ElevenLabs calls are network-bound.
+    # tts() itself is synchronous (async callers run it in a worker thread),
+    # so it drives the batch on its own event loop.
+    keys = list(unique)
+    results = asyncio.run(generate_audio_batch(keys, force_regenerate=force_regenerate))
+    unique.update(zip(keys, results))
 
-    for speaker, text in script:
-        audio, normalized_speaker = generate_audio_for_speaker(text, speaker)
-        audio_segments.append(audio)
-        speakers.append(normalized_speaker)
-        transcript_parts.append(text)
-    
-    # Combine all text lines into a single transcript
-    combined_transcript = " ".join(transcript_parts)
+    # Fan results back out in script order
+    segments_pcm: list[bytes] = [unique[(sp, tx)][0] for sp, tx in script]
+    speakers: list[str] = [unique[(sp, tx)][3] for sp, tx in script]
+
+    # Combine all text lines into a single transcript for WhisperX alignment
+    combined_transcript = " ".join(text for _, text in script)
 
     # Combine audio segments with timing information
-    combined_wav, timings = combine_to_wav_with_timings(audio_segments, speakers)
-
-    # Use WhisperX to get word-level alignments
-    # Save WAV to temporary file for WhisperX
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_wav:
-        temp_wav.write(combined_wav)
-        temp_wav_path = temp_wav.name
-
-    try:
-        # Run WhisperX alignment
-        word_alignments = align_with_whisperx(temp_wav_path, combined_transcript)
-    finally:
-        # Clean up temporary file
-        if os.path.exists(temp_wav_path):
-            os.unlink(temp_wav_path)
-
-    return combined_wav, timings, word_alignments
+    samples, timings = combine_with_timings(segments_pcm, speakers)
+    audio = save_wav(samples, out_path)
+
+    # WhisperX aligns against the in-memory samples; no WAV round-trip
+    word_alignments = align_with_whisperx(
+        samples, combined_transcript, _audio_duration(timings),
+        line_segments=_line_segments(script, timings),
+    )
+
+    return audio, timings, word_alignments
 
 
 __all__ = ['tts']
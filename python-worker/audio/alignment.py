@@ -2,48 +2,102 @@
 Word-level alignment using WhisperX.
 """
 import whisperx
-import torchaudio
 import logging
+import numpy as np
+import torch
+import torchaudio.functional as AF
+from whisperx.audio import SAMPLE_RATE as WHISPERX_SR
+from functools import lru_cache
+from typing import Optional
+from audio.config import TARGET_SR
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=None)
+def whisperx_device() -> str:
+    """WhisperX alignment device: "cuda" when a GPU is available, else "cpu"."""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+@lru_cache(maxsize=4)
+def _get_align_model(language: str, device: str):
+    """
+    Load (once) the WhisperX alignment model for a language/device pair.
+    
+    Args:
+        language: Language code
+        device: Device to load the model on
+        
+    Returns:
+        Tuple of (align_model, metadata)
+    """
+    logger.info(f"Loading WhisperX align model for language={language} on {device}")
+    return whisperx.load_align_model(language_code=language, device=device)
+
+
+def _to_whisperx_audio(samples: np.ndarray) -> np.ndarray:
+    """
+    Convert int16 samples at TARGET_SR to the float32 16 kHz mono array
+    `whisperx.load_audio` would have produced.
+    
+    Args:
+        samples: Mono int16 samples at the target sample rate
+        
+    Returns:
+        float32 samples in [-1, 1) at WhisperX's sample rate
+    """
+    audio = torch.from_numpy(samples.astype(np.float32) / 32768.0)
+    return AF.resample(audio, TARGET_SR, WHISPERX_SR).numpy()
+
+
 def align_with_whisperx(
-    audio_path: str, 
+    samples: np.ndarray, 
     transcript: str,
+    duration: float,
     language: str = "en",
-    device: str = "cpu"
+    device: Optional[str] = None,
+    line_segments: Optional[list[tuple[str, float, float]]] = None
 ) -> list[tuple[str, float, float]]:
     """
     Use WhisperX forced alignment to get word-level timestamps.
     
     Args:
-        audio_path: Path to audio file
+        samples: Combined mono int16 samples at the target sample rate, used
+            directly instead of decoding a WAV file with ffmpeg
         transcript: Full transcript text
+        duration: Audio duration in seconds (known by the caller that built
+            the audio, so the file is not probed a second time)
         language: Language code (default "en")
-        device: Device to run alignment on (default "cpu")
+        device: Device to run alignment on (default: "cuda" if available, else "cpu")
+        line_segments: Optional list of (text, start_time, end_time) tuples, one
+            per spoken line. When given, each line is aligned within its own
+            window instead of aligning the whole transcript over the full audio.
         
     Returns:
         List of (word, start_time, end_time) tuples
     """
-    # Load audio
-    audio = whisperx.load_audio(audio_path)
-
-    # Get audio duration
-    info = torchaudio.info(audio_path)
-    duration = info.num_frames / float(info.sample_rate)
-
-    # Create a single segment spanning the entire audio duration
-    segments = [{
-        "start": 0.0,
-        "end": duration,
-        "text": transcript
-    }]
-
-    # Load alignment model
-    align_model, metadata = whisperx.load_align_model(
-        language_code=language, device=device
-    )
+    if device is None:
+        device = whisperx_device()
+    audio = _to_whisperx_audio(samples)
+
+    if line_segments:
+        # One short window per line keeps the CTC alignment small
+        segments = [{
+            "start": start,
+            "end": end,
+            "text": text
+        } for text, start, end in line_segments]
+    else:
+        # Create a single segment spanning the entire audio duration
+        segments = [{
+            "start": 0.0,
+            "end": duration,
+            "text": transcript
+        }]
+
+    # Load alignment model (cached after the first call)
+    align_model, metadata = _get_align_model(language, device)
 
     # Run alignment
     aligned = whisperx.align(
@@ -59,7 +113,7 @@ def align_with_whisperx(
     word_alignments = []
     segments = aligned["segments"]
     for i, segment in enumerate(segments):
-        words = segment["words"]
+        words = segment.get("words", [])
         for j, w in enumerate(words):
             # Determine start
             if "start" in w:
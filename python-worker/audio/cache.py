@@ -0,0 +1,56 @@
+"""
+On-disk cache for synthesized TTS audio.
+"""
+import hashlib
+from typing import Optional
+from diskcache import Cache
+from audio.config import TTS_CACHE_DIR
+
+# Bump when the meaning of cached audio changes (e.g. normalization moved
+# into the TTS step), so stale entries are never served
+_KEY_VERSION = 2
+
+_cache: Optional[Cache] = None
+
+
+def _get_cache() -> Cache:
+    """Open the cache directory on first use."""
+    global _cache
+    if _cache is None:
+        _cache = Cache(TTS_CACHE_DIR)
+    return _cache
+
+
+def make_key(
+    output_format: str,
+    voice_id: str,
+    model_id: str,
+    speed: float,
+    text: str
+) -> str:
+    """
+    Build a cache key for a synthesized line.
+    
+    Args:
+        output_format: Audio format of the cached bytes (e.g. "pcm_44100")
+        voice_id: ElevenLabs voice ID
+        model_id: ElevenLabs model ID
+        speed: Playback speed multiplier applied after synthesis
+        text: Text that was synthesized
+        
+    Returns:
+        Hex SHA-256 digest identifying the audio
+    """
+    return hashlib.sha256(
+        f"v{_KEY_VERSION}|{output_format}|{voice_id}|{model_id}|{speed}|{text}".encode()
+    ).hexdigest()
+
+
+def get(key: str) -> Optional[bytes]:
+    """Return cached audio bytes for `key`, or None on a miss."""
+    return _get_cache().get(key)
+
+
+def put(key: str, audio: bytes) -> None:
+    """Store audio bytes under `key`."""
+    _get_cache().set(key, audio)
@@ -1,8 +1,23 @@
 """
 ElevenLabs client initialization.
 """
+import httpx
 from elevenlabs.client import ElevenLabs
-from audio.config import ELEVENLABS_API_KEY
+from audio.config import (
+    ELEVENLABS_API_KEY,
+    TTS_HTTP_MAX_CONNECTIONS,
+    TTS_HTTP_TIMEOUT,
+)
 
-client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
+# One pooled HTTP/2 client for the whole process, so concurrent synths reuse
+# TCP/TLS connections instead of handshaking per call
+_http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(
+        max_connections=TTS_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=TTS_HTTP_MAX_CONNECTIONS,
+    ),
+    timeout=TTS_HTTP_TIMEOUT,
+)
 
+client = ElevenLabs(api_key=ELEVENLABS_API_KEY, httpx_client=_http_client)
@@ -9,8 +9,19 @@ logger = logging.getLogger(__name__)
 # Audio format constants
 TARGET_SR = 44100  # Target sample rate
 TARGET_CH = 1  # Mono channel
+SAMPLE_WIDTH = 2  # 16-bit PCM
+TTS_OUTPUT_FORMAT = f"pcm_{TARGET_SR}"  # Raw 16-bit mono PCM from ElevenLabs
+WAV_WRITE_BUFFER = 1 << 20  # 1 MiB buffer when writing WAV files to disk
 PAUSE_MS = 200  # Pause duration between speaker turns in milliseconds
 
+# TTS request concurrency
+TTS_MAX_WORKERS = 8  # Max concurrent ElevenLabs requests per script
+TTS_HTTP_MAX_CONNECTIONS = 16  # Keep-alive pool shared by all TTS requests
+TTS_HTTP_TIMEOUT = 60  # Seconds per ElevenLabs request
+
+# TTS output cache (keyed by voice settings + text)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "/data/tts_cache")
+
 # ElevenLabs API configuration
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 if not ELEVENLABS_API_KEY:
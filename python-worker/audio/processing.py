@@ -2,95 +2,185 @@
 Audio processing: segmenting, combining, and formatting.
 """
 import io
-from pydub import AudioSegment, effects
-from audio.config import TARGET_SR, TARGET_CH, PAUSE_MS
+import struct
+import subprocess
+import numpy as np
+from typing import BinaryIO, Optional
+from audio.config import TARGET_SR, TARGET_CH, SAMPLE_WIDTH, PAUSE_MS, WAV_WRITE_BUFFER
 
+# Number of int16 samples in the pause between speaker turns
+PAUSE_SAMPLES = int(PAUSE_MS / 1000 * TARGET_SR) * TARGET_CH
+# Shared, read-only silence copied into each gap between segments
+_PAUSE = np.zeros(PAUSE_SAMPLES, dtype=np.int16)
+_PAUSE.flags.writeable = False
 
-def segment_from_mp3_bytes(mp3_bytes: bytes) -> AudioSegment:
+# Peak level segments are normalized to (0.1 dB headroom, as pydub's normalize)
+NORMALIZE_HEADROOM_DB = 0.1
+NORMALIZE_TARGET_PEAK = 32768 * 10 ** (-NORMALIZE_HEADROOM_DB / 20)
+
+
+def run_ffmpeg(args: list[str], input_bytes: bytes | bytearray | memoryview) -> bytes:
+    """
+    Run ffmpeg with stdin/stdout pipes and return what it writes to stdout.
+    
+    Args:
+        args: ffmpeg arguments, reading from pipe:0 and writing to pipe:1
+        input_bytes: Bytes fed to ffmpeg's stdin
+        
+    Returns:
+        ffmpeg's stdout bytes
+        
+    Raises:
+        RuntimeError: If ffmpeg exits with a non-zero status
+    """
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", *args],
+        input=input_bytes,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode(errors='replace')}")
+    return proc.stdout
+
+
+def normalize_pcm(pcm: bytes) -> bytes:
     """
-    Convert MP3 bytes to a normalized AudioSegment.
+    Peak-normalize one 16-bit PCM segment so every line plays at the same level.
     
     Args:
-        mp3_bytes: MP3 audio bytes
+        pcm: Raw 16-bit PCM bytes
         
     Returns:
-        Normalized AudioSegment with target sample rate and channels
+        Normalized 16-bit PCM bytes (the input itself if silent or empty)
     """
-    buf = io.BytesIO(mp3_bytes)
-    seg = AudioSegment.from_file(buf, format="mp3")
-    # Normalize format for editing
-    seg = seg.set_frame_rate(TARGET_SR).set_channels(TARGET_CH)
-    # Optional: loudness normalization so voices match
-    seg = effects.normalize(seg)
-    return seg
+    arr = np.frombuffer(pcm, dtype=np.int16)
+    if not arr.size:
+        return pcm
+    # Peak from min/max reductions: no abs() or int32 copy of the segment
+    peak = max(int(arr.max()), -int(arr.min()))
+    if not peak:
+        return pcm
+    buf = np.multiply(arr, NORMALIZE_TARGET_PEAK / peak, dtype=np.float32)
+    # |arr * gain| <= NORMALIZE_TARGET_PEAK < 32767, so no clip pass
+    np.rint(buf, out=buf)
+    return buf.astype(np.int16).tobytes()
 
 
-def combine_to_wav(audio_segments_mp3: list[bytes]) -> bytes:
+def assemble_samples(segments_pcm: list[bytes]) -> tuple[np.ndarray, list[int]]:
     """
-    Combine multiple MP3 audio segments into a single WAV file.
+    Lay out 16-bit PCM segments, separated by pauses, in one int16 array.
     
-    Takes a list of MP3 byte blobs, converts each to a normalized WAV segment,
-    concatenates with small pauses, and returns PCM WAV bytes.
+    This is a pure join: segments are expected to be normalized already. The
+    output is allocated once at its final size and each segment is copied into
+    its slice, so cost is linear in the total audio length.
     
     Args:
-        audio_segments_mp3: List of MP3 audio byte blobs
+        segments_pcm: List of raw 16-bit PCM byte blobs at the target format
         
     Returns:
-        Combined WAV audio bytes
+        Tuple of (samples, offsets) where offsets[i] is the sample index at
+        which segment i starts.
     """
-    combined = AudioSegment.silent(duration=0, frame_rate=TARGET_SR)
-    for i, mp3_bytes in enumerate(audio_segments_mp3):
-        seg = segment_from_mp3_bytes(mp3_bytes)
-        combined += seg
-        if i != len(audio_segments_mp3) - 1:
-            combined += AudioSegment.silent(duration=PAUSE_MS, frame_rate=TARGET_SR)
+    arrays = [np.frombuffer(pcm, dtype=np.int16) for pcm in segments_pcm]
 
-    out = io.BytesIO()
-    combined.export(out, format="wav")  # 16-bit PCM
-    return out.getvalue()
+    offsets: list[int] = []
+    total = 0
+    for i, arr in enumerate(arrays):
+        offsets.append(total)
+        total += arr.size
+        if i != len(arrays) - 1:
+            total += PAUSE_SAMPLES
 
+    # Every sample is written exactly once (segment or pause), so skip zeroing
+    out = np.empty(total, dtype=np.int16)
+    for i, (offset, arr) in enumerate(zip(offsets, arrays)):
+        end = offset + arr.size
+        out[offset:end] = arr
+        if i != len(arrays) - 1:
+            out[end:end + PAUSE_SAMPLES] = _PAUSE
+    return out, offsets
 
-def combine_to_wav_with_timings(
-    audio_segments_mp3: list[bytes], 
-    speakers: list[str]
-) -> tuple[bytes, list[tuple[str, float, float]]]:
+
+def wav_header(data_size: int) -> bytes:
+    """
+    Build the 44-byte RIFF/WAVE header for 16-bit PCM in the target format.
+    
+    Args:
+        data_size: Size of the PCM data chunk in bytes
+        
+    Returns:
+        Header bytes to place directly before the PCM data
     """
-    Combine audio segments with speaker timing information.
+    block_align = TARGET_CH * SAMPLE_WIDTH
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, TARGET_CH, TARGET_SR,
+        TARGET_SR * block_align, block_align, SAMPLE_WIDTH * 8,
+        b"data", data_size,
+    )
+
+
+def write_wav(f: BinaryIO, samples: np.ndarray) -> None:
+    """
+    Write int16 samples to a file object as a 16-bit PCM WAV.
     
-    Takes a list of MP3 byte blobs and speaker names, converts each to a normalized WAV segment,
-    concatenates with small pauses, and returns PCM WAV bytes along with timing data.
+    Args:
+        f: Writable binary file object
+        samples: int16 samples at the target sample rate and channels
+    """
+    f.write(wav_header(samples.nbytes))
+    f.write(memoryview(samples))
+
+
+def combine_with_timings(
+    segments_pcm: list[bytes],
+    speakers: list[str]
+) -> tuple[np.ndarray, list[tuple[str, float, float]]]:
+    """
+    Lay out audio segments with pauses and compute speaker timings.
     
     Args:
-        audio_segments_mp3: List of MP3 audio byte blobs
+        segments_pcm: List of normalized 16-bit PCM blobs at the target format
+            (e.g. from the TTS step)
         speakers: List of speaker names corresponding to each segment
         
     Returns:
-        Tuple of (wav_bytes, timing_data) where timing_data is list of 
-        (speaker, start_time, end_time) tuples.
+        Tuple of (samples, timing_data) where samples are the combined int16
+        samples and timing_data is list of (speaker, start_time, end_time) tuples.
     """
-    combined = AudioSegment.silent(duration=0, frame_rate=TARGET_SR)
-    timings: list[tuple[str, float, float]] = []
-    current_time = 0.0
+    samples, offsets = assemble_samples(segments_pcm)
 
-    for i, (mp3_bytes, speaker) in enumerate(zip(audio_segments_mp3, speakers)):
-        seg = segment_from_mp3_bytes(mp3_bytes)
-        seg_duration_seconds = len(seg) / 1000.0  # pydub duration is in milliseconds
-
-        # Record timing for this segment
-        start_time = current_time
-        end_time = current_time + seg_duration_seconds
-        timings.append((speaker, start_time, end_time))
+    # Timings fall straight out of the sample offsets
+    samples_per_second = TARGET_SR * TARGET_CH
+    timings: list[tuple[str, float, float]] = []
+    for speaker, offset, pcm in zip(speakers, offsets, segments_pcm):
+        num_samples = len(pcm) // SAMPLE_WIDTH
+        timings.append((
+            speaker,
+            offset / samples_per_second,
+            (offset + num_samples) / samples_per_second,
+        ))
+    return samples, timings
 
-        combined += seg
-        current_time = end_time
 
-        # Add pause if not last segment
-        if i != len(audio_segments_mp3) - 1:
-            pause_duration_seconds = PAUSE_MS / 1000.0
-            combined += AudioSegment.silent(duration=PAUSE_MS, frame_rate=TARGET_SR)
-            current_time += pause_duration_seconds
+def save_wav(samples: np.ndarray, out_path: Optional[str] = None) -> bytes | str:
+    """
+    Encode int16 samples as a WAV, on disk or in memory.
+    
+    Args:
+        samples: int16 samples at the target sample rate and channels
+        out_path: If given, write the WAV to this path
+        
+    Returns:
+        `out_path` when one was given, otherwise the WAV bytes
+    """
+    if out_path is not None:
+        # Stream to disk through a large buffer; skips the in-memory copy
+        with open(out_path, "wb", buffering=WAV_WRITE_BUFFER) as f:
+            write_wav(f, samples)
+        return out_path
 
     out = io.BytesIO()
-    combined.export(out, format="wav")  # 16-bit PCM
-    return out.getvalue(), timings
-
+    write_wav(out, samples)
+    return out.getvalue()
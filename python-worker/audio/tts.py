@@ -1,73 +1,180 @@
 """
 Text-to-speech generation using ElevenLabs.
 """
-import io
-from pydub import AudioSegment
+import asyncio
+from audio import cache
 from audio.client import client
-from audio.config import VOICE_CONFIGS
+from audio.processing import normalize_pcm, run_ffmpeg
+from audio.config import (
+    VOICE_CONFIGS, TTS_OUTPUT_FORMAT, TARGET_SR, TARGET_CH, TTS_MAX_WORKERS
+)
 
 
-def generate_audio_from_text(text: str, voice_name: str) -> bytes:
+_VOICE_NAMES = tuple(VOICE_CONFIGS)
+
+# Speaker name (as written in scripts, or lowercased) -> voice name
+_SPEAKER_MAP = {
+    **{name: name for name in VOICE_CONFIGS},
+    **{name.capitalize(): name for name in VOICE_CONFIGS},
+}
+
+
+def _atempo_filter(speed: float) -> str:
+    """
+    Build an ffmpeg atempo filter chain for a speed multiplier.
+    
+    A single atempo stage only accepts factors in [0.5, 2.0], so larger or
+    smaller speeds are split into a chain of stages.
+    
+    Args:
+        speed: Playback speed multiplier (> 0)
+        
+    Returns:
+        Filter string such as "atempo=1.2" or "atempo=2.0,atempo=1.5"
+    """
+    stages = []
+    while speed > 2.0:
+        stages.append(2.0)
+        speed /= 2.0
+    while speed < 0.5:
+        stages.append(0.5)
+        speed /= 0.5
+    stages.append(speed)
+    return ",".join(f"atempo={stage}" for stage in stages)
+
+
+def speed_up_pcm(pcm_bytes: bytes | bytearray | memoryview, speed: float) -> bytes:
+    """
+    Time-stretch raw PCM with ffmpeg's atempo filter in one streaming pass.
+    
+    Args:
+        pcm_bytes: 16-bit PCM at the target rate/channels
+        speed: Playback speed multiplier
+        
+    Returns:
+        Speed-adjusted 16-bit PCM in the same format
+    """
+    pcm_format = [
+        "-f", "s16le", "-ar", str(TARGET_SR), "-ac", str(TARGET_CH),
+    ]
+    return run_ffmpeg([
+        *pcm_format, "-i", "pipe:0",
+        "-filter:a", _atempo_filter(speed),
+        *pcm_format, "pipe:1",
+    ], pcm_bytes)
+
+
+def generate_audio_from_text(
+    text: str,
+    voice_name: str,
+    force_regenerate: bool = False
+) -> bytes:
     """
     Generate audio from text using the specified voice.
     
+    The ElevenLabs PCM stream is sped up in one ffmpeg pass and peak-normalized
+    in NumPy, so it is ready to be joined as-is. Results are cached on disk by
+    voice settings and text, so repeated lines skip the ElevenLabs call.
+    
     Args:
         text: Text to convert to speech
         voice_name: Voice name ('peter' or 'stewie')
+        force_regenerate: Bypass the cache and synthesize again (default False)
         
     Returns:
-        MP3 audio bytes
+        Speed-adjusted, normalized raw 16-bit PCM at the target rate/channels
         
     Raises:
         ValueError: If voice_name is not recognized
     """
-    if voice_name not in VOICE_CONFIGS:
-        raise ValueError(f"Unknown voice: {voice_name}. Must be one of {list(VOICE_CONFIGS.keys())}")
-    
-    voice_config = VOICE_CONFIGS[voice_name]
+    voice_config = VOICE_CONFIGS.get(voice_name)
+    if voice_config is None:
+        raise ValueError(f"Unknown voice: {voice_name}. Must be one of {_VOICE_NAMES}")
+    voice_id = voice_config["voice_id"]
+    model_id = voice_config["model_id"]
+    speed = voice_config["speed_multiplier"]
+
+    cache_key = cache.make_key(TTS_OUTPUT_FORMAT, voice_id, model_id, speed, text)
+    if not force_regenerate:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
     
-    # Generate audio using ElevenLabs
+    # Generate audio using ElevenLabs as raw PCM, so no MP3 decode is needed
     audio = client.text_to_speech.convert(
         text=text,
-        voice_id=voice_config["voice_id"],
-        model_id=voice_config["model_id"],
-        output_format="mp3_44100_128",
+        voice_id=voice_id,
+        model_id=model_id,
+        output_format=TTS_OUTPUT_FORMAT,
     )
     
-    mp3_bytes = b"".join(list(audio))
-    
-    # Apply speed adjustment
-    buf = io.BytesIO(mp3_bytes)
-    seg = AudioSegment.from_file(buf, format="mp3")
-    seg = seg.speedup(playback_speed=voice_config["speed_multiplier"])
+    # Append PCM chunks as they arrive instead of materializing a list first
+    pcm = bytearray()
+    for chunk in audio:
+        pcm.extend(chunk)
     
-    out = io.BytesIO()
-    seg.export(out, format="mp3")
-    return out.getvalue()
+    # Apply speed adjustment (ffmpeg reads the buffer in place, no bytes()
+    # copy), then normalize so the combine step is a pure join
+    pcm = normalize_pcm(speed_up_pcm(memoryview(pcm), speed))
 
+    cache.put(cache_key, pcm)
+    return pcm
 
-def generate_audio_for_speaker(text: str, speaker: str) -> tuple[bytes, str]:
+
+def generate_pcm_for_speaker(
+    text: str,
+    speaker: str,
+    force_regenerate: bool = False
+) -> tuple[bytes, int, int, str]:
     """
-    Generate audio for a speaker and return normalized speaker name.
+    Generate PCM audio for a speaker and return normalized speaker name.
     
     Args:
         text: Text to convert to speech
         speaker: Speaker name ('Peter' or 'Stewie')
+        force_regenerate: Bypass the TTS cache (default False)
         
     Returns:
-        Tuple of (audio_bytes, normalized_speaker_name)
+        Tuple of (pcm_bytes, sample_rate, channels, normalized_speaker_name)
         
     Raises:
         ValueError: If speaker is not recognized
     """
-    speaker_lower = speaker.lower()
-    
-    if speaker_lower == "peter":
-        audio = generate_audio_from_text(text, "peter")
-        return audio, "peter"
-    elif speaker_lower == "stewie":
-        audio = generate_audio_from_text(text, "stewie")
-        return audio, "stewie"
-    else:
+    voice_name = _SPEAKER_MAP.get(speaker) or _SPEAKER_MAP.get(speaker.lower())
+    if voice_name is None:
         raise ValueError(f"Unknown speaker: {speaker}. Must be 'Peter' or 'Stewie'")
+    pcm = generate_audio_from_text(text, voice_name, force_regenerate)
+    return pcm, TARGET_SR, TARGET_CH, voice_name
+
+
+async def generate_audio_batch(
+    lines: list[tuple[str, str]],  # (speaker, text)
+    max_concurrency: int = TTS_MAX_WORKERS,
+    force_regenerate: bool = False
+) -> list[tuple[bytes, int, int, str]]:
+    """
+    Generate audio for many lines concurrently.
+    
+    The ElevenLabs SDK is synchronous, so each line runs in a worker thread;
+    a semaphore bounds how many requests are in flight at once.
+    
+    Args:
+        lines: List of (speaker, text) tuples
+        max_concurrency: Max simultaneous ElevenLabs requests
+        force_regenerate: Bypass the TTS cache (default False)
+        
+    Returns:
+        List of (pcm_bytes, sample_rate, channels, normalized_speaker_name)
+        tuples, in the same order as `lines`
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
 
+    async def generate_one(speaker: str, text: str) -> tuple[bytes, int, int, str]:
+        async with semaphore:
+            return await asyncio.to_thread(
+                generate_pcm_for_speaker, text, speaker, force_regenerate
+            )
+
+    return await asyncio.gather(
+        *(generate_one(speaker, text) for speaker, text in lines)
+    )
@@ -1,6 +1,10 @@
-from openai import OpenAI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+from diskcache import Cache
 from enum import Enum
+from functools import lru_cache
+from typing import Optional
+import hashlib
+import orjson
 import os
 
 SCRIPT_SYSTEM_PROMPT = """
@@ -69,15 +73,58 @@ class Topic(BaseModel):
     query: str = Field(description="A web search query about the best seed for a short-form news report style technical-focused video")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY is not set")
-client = OpenAI(api_key=OPENAI_API_KEY)
-script_schema = Script.model_json_schema()
+
+@lru_cache(maxsize=None)
+def _client():
+    # Imported and constructed on first use so importing this module stays cheap
+    from openai import OpenAI
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY is not set")
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+@lru_cache(maxsize=None)
+def _json_schema(schema: type[BaseModel]) -> dict:
+    # Schema generation walks the whole model graph; do it once per class
+    return schema.model_json_schema()
+
+script_schema = _json_schema(Script)
+
+OPENAI_MODEL = "o3"
+
+# Responses are cached on disk by exact (model, prompts, schema) match
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "/data/llm_cache")
+_llm_cache: Optional[Cache] = None
+
+def _get_llm_cache() -> Cache:
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = Cache(LLM_CACHE_DIR)
+    return _llm_cache
+
+def _llm_cache_key(system_prompt: str, user_prompt: str, schema: type[BaseModel]) -> str:
+    payload = orjson.dumps({
+        "m": OPENAI_MODEL,
+        "s": system_prompt,
+        "u": user_prompt,
+        # The full JSON schema, so changing a model's fields invalidates its entries
+        "j": _json_schema(schema),
+    }, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
 
 
 def generate_json_response(system_prompt: str, user_prompt: str, schema: type[BaseModel]) -> BaseModel:
-    response = client.chat.completions.create(
-        model="o3",
+    cache = _get_llm_cache()
+    key = _llm_cache_key(system_prompt, user_prompt, schema)
+    cached = cache.get(key)
+    if cached is not None:
+        try:
+            return schema.model_validate_json(cached)
+        except ValidationError:
+            # Stale or corrupt entry; drop it and ask the model again
+            cache.delete(key)
+
+    response = _client().chat.completions.create(
+        model=OPENAI_MODEL,
         messages=[{
             "role": "system",
             "content": system_prompt
@@ -89,13 +136,17 @@ def generate_json_response(system_prompt: str, user_prompt: str, schema: type[Ba
             "type": "json_schema",
             "json_schema": {
                 "name": schema.__name__.lower(),
-                "schema": schema.model_json_schema()
+                "schema": _json_schema(schema)
             }
         })
     
     json_content = response.choices[0].message.content
-    # Call model_validate_json on the schema class, not BaseModel
-    return schema.model_validate_json(json_content)
+    # Call model_validate_json on the schema class, not BaseModel; pydantic-core
+    # parses the JSON in Rust, so no json/orjson.loads step is needed
+    result = schema.model_validate_json(json_content)
+    # Only cache responses that validated
+    cache.set(key, json_content)
+    return result
 
 def generate_script(text: str) -> tuple[str, list[tuple[str, str]]]: # (title, script)
     """
@@ -1,10 +1,12 @@
 import os
+import time
 from dotenv import load_dotenv
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+import json
 import pickle
 
 load_dotenv()
@@ -20,8 +22,12 @@ GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 GOOGLE_SPREADSHEET_ID = os.getenv("GOOGLE_SPREADSHEET_ID")
 GOOGLE_SHEET_NAME = os.getenv("GOOGLE_SHEET_NAME", "Sheet1")  # Default to Sheet1
 
-# Token file path
-TOKEN_FILE = os.path.join(os.path.dirname(__file__), 'token.pickle')
+# How long get_all_queries may serve its in-process copy of column A
+QUERIES_CACHE_TTL = 300  # seconds
+
+# Token file paths (the pickle file is only read to migrate old tokens)
+TOKEN_FILE = os.path.join(os.path.dirname(__file__), 'token.json')
+LEGACY_TOKEN_FILE = os.path.join(os.path.dirname(__file__), 'token.pickle')
 
 
 def get_credentials():
@@ -32,9 +38,14 @@ def get_credentials():
     creds = None
     
     # Load existing token if available
+    migrated = False
     if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, 'rb') as token:
+        with open(TOKEN_FILE) as token:
+            creds = Credentials.from_authorized_user_info(json.load(token), SCOPES)
+    elif os.path.exists(LEGACY_TOKEN_FILE):
+        with open(LEGACY_TOKEN_FILE, 'rb') as token:
             creds = pickle.load(token)
+        migrated = True
     
     # If there are no (valid) credentials available, let the user log in
     if not creds or not creds.valid:
@@ -55,24 +66,54 @@ def get_credentials():
             creds = flow.run_local_server(port=0)
         
         # Save credentials for next run
-        with open(TOKEN_FILE, 'wb') as token:
-            pickle.dump(creds, token)
+        save_credentials(creds)
+    elif migrated:
+        # Re-save tokens from the legacy pickle file as JSON
+        save_credentials(creds)
     
     return creds
 
 
+def save_credentials(creds):
+    """
+    Save credentials to the token file as JSON.
+    """
+    with open(TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
+
+
+# Built once per process; rebuilt only when the credentials stop being valid
+_service = None
+_service_creds = None
+
+
 def get_service():
     """
     Get Google Sheets service object.
     """
-    creds = get_credentials()
-    return build('sheets', 'v4', credentials=creds)
+    global _service, _service_creds
+    if _service is None or not _service_creds.valid:
+        _service_creds = get_credentials()
+        _service = build('sheets', 'v4', credentials=_service_creds,
+                         cache_discovery=False)
+    return _service
+
+
+# In-process copy of the queries column, kept current by add_to_sheet
+_queries_cache = {"ts": 0.0, "data": None}
+
+# Sheets whose header row has already been verified in this process
+_header_checked = set()
 
 
 def ensure_header_exists(service, spreadsheet_id, sheet_name):
     """
     Ensure the header row exists in the sheet.
+    
+    The check runs once per sheet per process; later calls make no API request.
     """
+    if (spreadsheet_id, sheet_name) in _header_checked:
+        return
     try:
         # Get the sheet to check if header exists
         sheet = service.spreadsheets()
@@ -101,17 +142,23 @@ def ensure_header_exists(service, spreadsheet_id, sheet_name):
             ).execute()
         except Exception as e:
             raise Exception(f"Failed to create header: {e}")
+    _header_checked.add((spreadsheet_id, sheet_name))
 
 
-def add_to_sheet(query: str):
+def add_many_to_sheet(queries: list[str]):
     """
-    Add a query to the Google Sheet.
+    Add several queries to the Google Sheet in a single API request.
+    
+    All rows go in one values.append call, so they are written together and
+    count as one request against the Sheets quota.
     
     Args:
-        query: The query string to add to the sheet
+        queries: The query strings to add, one row each
     """
     if not GOOGLE_SPREADSHEET_ID:
         raise ValueError("GOOGLE_SPREADSHEET_ID environment variable is not set")
+    if not queries:
+        return None
     
     try:
         service = get_service()
@@ -119,23 +166,38 @@ def add_to_sheet(query: str):
         # Ensure header exists
         ensure_header_exists(service, GOOGLE_SPREADSHEET_ID, GOOGLE_SHEET_NAME)
         
-        # Append the query to the sheet
+        # Append all queries to the sheet
         sheet = service.spreadsheets()
-        values = [[query]]
+        values = [[query] for query in queries]
         body = {'values': values}
         
         result = sheet.values().append(
             spreadsheetId=GOOGLE_SPREADSHEET_ID,
             range=f"{GOOGLE_SHEET_NAME}!A:A",
             valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
             body=body
         ).execute()
         
+        # Keep the cached query list in step with the sheet
+        if _queries_cache["data"] is not None:
+            _queries_cache["data"].extend(queries)
+        
         return result
     except HttpError as error:
         raise Exception(f"An error occurred while adding to sheet: {error}")
 
 
+def add_to_sheet(query: str):
+    """
+    Add a query to the Google Sheet.
+    
+    Args:
+        query: The query string to add to the sheet
+    """
+    return add_many_to_sheet([query])
+
+
 def get_all_queries():
     """
     Get all queries from the Google Sheet.
@@ -146,6 +208,10 @@ def get_all_queries():
     if not GOOGLE_SPREADSHEET_ID:
         raise ValueError("GOOGLE_SPREADSHEET_ID environment variable is not set")
     
+    if (_queries_cache["data"] is not None
+            and time.time() - _queries_cache["ts"] < QUERIES_CACHE_TTL):
+        return list(_queries_cache["data"])
+    
     try:
         service = get_service()
         sheet = service.spreadsheets()
@@ -165,6 +231,8 @@ def get_all_queries():
         # Skip the header row (first row)
         queries = [row[0] for row in values[1:] if row and len(row) > 0]
         
-        return queries
+        _queries_cache["ts"] = time.time()
+        _queries_cache["data"] = queries
+        return list(queries)
     except HttpError as error:
         raise Exception(f"An error occurred while reading from sheet: {error}")
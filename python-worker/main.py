@@ -1,13 +1,14 @@
+import asyncio
 import os
 import logging
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from twitter import get_tweets
 from serper import get_news_title_and_snippet, get_search_result_links
 from google_sheets import get_all_queries, add_to_sheet
 from generate_script import generate_topic, generate_script
-from extract_text import fetch_and_extract
+from extract_text import fetch_and_extract_batch
 from audio import tts
-from video import assemble_video, get_run_id
+from video import assemble_video, get_run_id, select_background
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,19 +16,35 @@ logger = logging.getLogger(__name__)
 def main():
     logger.info("Starting pipeline...")
     
-    # Step 1: Scrape tweets
-    logger.info("Scraping tweets...")
-    tweets = get_tweets("ai news")
-    logger.info(f"Found {len(tweets)} tweets")
+    # Get script directory for relative paths
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    bg_folder = os.path.join(script_dir, "background-videos")
     
-    # Step 2: Search "ml research" past week
-    logger.info("Searching ML research news...")
-    ml_research = get_news_title_and_snippet("ml research", "w")
+    # Picking (and pre-scaling) the background doesn't depend on the script,
+    # so do it in the background while the steps below run
+    bg_executor = ThreadPoolExecutor(max_workers=1)
+    bg_future = bg_executor.submit(select_background, bg_folder)
+    bg_executor.shutdown(wait=False)
+    
+    # Steps 1-3 are independent network calls, so run them concurrently
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        # Step 1: Scrape tweets
+        logger.info("Scraping tweets...")
+        tweets_future = executor.submit(get_tweets, "ai news")
+        
+        # Step 2: Search "ml research" past week
+        logger.info("Searching ML research news...")
+        ml_research_future = executor.submit(get_news_title_and_snippet, "ml research", "w")
+        
+        # Step 3: Search "ai tech" past day
+        logger.info("Searching AI tech news...")
+        ai_tech_future = executor.submit(get_news_title_and_snippet, "ai tech", "d")
+        
+        tweets = tweets_future.result()
+        ml_research = ml_research_future.result()
+        ai_tech = ai_tech_future.result()
+    logger.info(f"Found {len(tweets)} tweets")
     logger.info(f"Found {len(ml_research)} ML research articles")
-    
-    # Step 3: Search "ai tech" past day
-    logger.info("Searching AI tech news...")
-    ai_tech = get_news_title_and_snippet("ai tech", "d")
     logger.info(f"Found {len(ai_tech)} AI tech articles")
     
     if len(ml_research) == 0 and len(ai_tech) == 0 and len(tweets) == 0:
@@ -67,9 +84,11 @@ def main():
     # Step 9: Extract content from URLs
     logger.info("Extracting content from URLs...")
     extracted_texts = []
-    for url in search_links[:6]:  # Limit to 10 URLs
-        logger.info(f"Extracting from: {url}")
-        text = fetch_and_extract(url)
+    urls = search_links[:6]  # Limit to 6 URLs
+    # Fetch all pages concurrently through the on-disk extraction cache;
+    # results keep the search-result order
+    texts = asyncio.run(fetch_and_extract_batch(urls))
+    for url, text in zip(urls, texts):
         if text:
             extracted_texts.append(text)
             logger.info(f"Extracted {len(text)} characters from {url}")
@@ -85,23 +104,9 @@ def main():
     
     # Step 12: Generate audio and timings
     logger.info("Generating audio...")
-    audio_bytes, speaker_timings, word_alignments = tts(script)
-    logger.info(f"Generated audio: {len(audio_bytes)} bytes, {len(speaker_timings)} speaker segments, {len(word_alignments)} word alignments")
-    
-    # Step 13: Save video
-    logger.info("Assembling video...")
     run_id = get_run_id()
     
-    # Get script directory for relative paths
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # Create temporary file for audio
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_audio:
-        temp_audio.write(audio_bytes)
-        temp_audio_path = temp_audio.name
-    
     # Set up paths
-    bg_folder = os.path.join(script_dir, "background-videos")
     pngs_folder = os.path.join(script_dir, "pngs")
     font_path = os.path.join(script_dir, "fonts", "SuperMalibu-Wp77v.ttf")
     out_path = os.path.join(script_dir, "final-videos", f"final-{run_id}.mp4")
@@ -109,9 +114,16 @@ def main():
     # Ensure output directory exists
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
     
+    # The WAV stays in memory; video assembly reads it without a temp file
+    audio_bytes, speaker_timings, word_alignments = tts(script)
+    logger.info(f"Generated audio: {len(audio_bytes)} bytes, {len(speaker_timings)} speaker segments, {len(word_alignments)} word alignments")
+    
+    # Step 13: Save video
+    logger.info("Assembling video...")
+    
     # Assemble video
     assemble_video(
-        dialogue_wav_path=temp_audio_path,
+        dialogue_wav=audio_bytes,
         bg_folder=bg_folder,
         out_path=out_path,
         speaker_timings=speaker_timings,
@@ -119,11 +131,9 @@ def main():
         word_alignments=word_alignments,
         font_path=font_path,
         title=title,
+        bg_path=bg_future.result(),
     )
     
-    # Clean up temporary audio file
-    os.unlink(temp_audio_path)
-    
     logger.info(f"Video saved to: {out_path}")
     logger.info("Pipeline completed successfully!")
 
@@ -1,5 +1,6 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 import os
 from dotenv import load_dotenv
 
@@ -13,25 +14,30 @@ HEADERS = {
   'X-API-KEY': API_KEY,
   'Content-Type': 'application/json'
 }
+# Shared keep-alive connection pool for all Serper calls
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
 def get_news(query: str, time_frame):
-    payload = json.dumps({
+    payload = orjson.dumps({
         "q": query,
         "tbs": f"qdr:{time_frame}"
     })
-    response = requests.request("POST", NEWS_URL, data=payload, headers=HEADERS)
-    return response.json()
+    response = SESSION.post(NEWS_URL, data=payload)
+    return orjson.loads(response.content)
 
 def get_news_title_and_snippet(query: str, time_frame: str) -> list[tuple[str, str]]:
     results = get_news(query, time_frame)
     return [(result['title'], result['snippet']) for result in results['news']]
 
 def get_search_results(query: str, time_frame: str) -> list[tuple[str, str]]:
-    payload = json.dumps({
+    payload = orjson.dumps({
         "q": query,
         "tbs": f"qdr:{time_frame}"
     })
-    response = requests.request("POST", SEARCH_URL, data=payload, headers=HEADERS)
-    return response.json()
+    response = SESSION.post(SEARCH_URL, data=payload)
+    return orjson.loads(response.content)
 
 def get_search_result_links(query: str, time_frame: str) -> list[str]:
     results = get_search_results(query, time_frame)
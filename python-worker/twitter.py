@@ -1,5 +1,6 @@
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
@@ -10,18 +11,27 @@ HEADERS = {
   'X-API-KEY': API_KEY,
   'Content-Type': 'application/json'
 }
+# Pages depend on the previous cursor, so they stay sequential; a shared
+# session at least keeps the connection alive between them
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
 def get_tweets(query: str) -> list[str]:
     cursor = None
     tweets = []
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    base_url = f"{url}?query={query} since:{yesterday}PST lang:en&queryType=Top"
     for i in range(3):
-        today = datetime.now().strftime("%Y-%m-%d")
-        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        query_url = f"{url}?query={query} since:{yesterday}PST lang:en&queryType=Top"
+        query_url = base_url
         if cursor:
             query_url += f"&cursor={cursor}"
-        response = requests.request("GET", query_url, headers=HEADERS)
-        tweets.extend([tweet["text"][:300] for tweet in response.json()["tweets"]])
-        cursor = response.json()["next_cursor"]
+        response = SESSION.get(query_url)
+        data = orjson.loads(response.content)
+        tweets.extend(tweet["text"][:300] for tweet in data["tweets"])
+        cursor = data.get("next_cursor")
+        if not cursor:  # last page; without a cursor we'd refetch page one
+            break
     return tweets
 
 if __name__ == "__main__":
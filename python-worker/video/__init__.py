@@ -1,8 +1,9 @@
 """
 Video processing module for assembling videos with backgrounds, titles, overlays, and captions.
 """
-from .assembler import assemble_video
+from .assembler import assemble_video, assemble_video_isolated
+from .background import prepare_vertical_backgrounds, select_background
 from .utils import get_run_id
 
-__all__ = ['assemble_video', 'get_run_id']
+__all__ = ['assemble_video', 'assemble_video_isolated', 'prepare_vertical_backgrounds', 'select_background', 'get_run_id']
 
@@ -1,15 +1,241 @@
 """
 Main video assembly logic.
 """
-from moviepy import AudioFileClip, CompositeVideoClip
-from .background import prepare_background_clip
+import io
+import logging
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+import numpy as np
+from moviepy import CompositeVideoClip, VideoFileClip
+from moviepy.config import FFMPEG_BINARY
+from .background import prepare_background_clip, select_background
 from .title import create_title_clip
 from .overlays import create_overlay_clips
 from .captions import create_caption_clips
 
+logger = logging.getLogger(__name__)
+
+# Render node used by the VAAPI encoder (Intel/AMD GPUs on Linux)
+VAAPI_DEVICE = os.getenv("VAAPI_DEVICE", "/dev/dri/renderD128")
+
+# Hardware H.264 encoders in order of preference: name -> (codec, preset,
+# extra ffmpeg params). Rate control is added separately (see below).
+_HW_ENCODERS = {
+    "nvenc": ("h264_nvenc", "p4", ["-rc", "vbr"]),
+    "videotoolbox": ("h264_videotoolbox", "medium", ["-allow_sw", "1", "-realtime", "0"]),
+    "vaapi": ("h264_vaapi", "medium", [
+        "-vaapi_device", VAAPI_DEVICE, "-vf", "format=nv12,hwupload",
+    ]),
+}
+_CPU_ENCODER = ("libx264", "veryfast", [])
+
+# Constant-quality rate control per codec, capped so uploads stay within
+# Instagram's limits. Encoders without a quality mode get a target bitrate.
+VIDEO_QUALITY = 23  # x264 CRF / NVENC CQ
+VIDEO_FALLBACK_BITRATE = "6M"
+VIDEO_MAXRATE = "8M"
+VIDEO_BUFSIZE = "12M"
+_RATE_CONTROL = {
+    "libx264": ["-crf", str(VIDEO_QUALITY), "-profile:v", "high", "-level", "4.0"],
+    "h264_nvenc": ["-cq", str(VIDEO_QUALITY), "-b:v", "0"],  # -b:v 0: pure CQ
+    "h264_videotoolbox": ["-b:v", VIDEO_FALLBACK_BITRATE],
+    "h264_vaapi": ["-b:v", VIDEO_FALLBACK_BITRATE],
+}
+_RATE_CAP = ["-maxrate", VIDEO_MAXRATE, "-bufsize", VIDEO_BUFSIZE]
+
+# libx264 preset by background motion: "veryfast" for calm footage, where a
+# slower preset barely changes quality, and "medium" above this temporal
+# information score (mean absolute luma change between consecutive frames)
+X264_HIGH_MOTION_TI = 12.0
+
+# Worker processes for assemble_video_isolated: how many reels are assembled
+# at once (each worker holds a full render in memory), and how many reels a
+# worker assembles before it is replaced
+ASSEMBLE_WORKERS = int(os.getenv("ASSEMBLE_WORKERS", "1"))
+ASSEMBLE_TASKS_PER_WORKER = int(os.getenv("ASSEMBLE_TASKS_PER_WORKER", "20"))
+
+
+@lru_cache(maxsize=None)
+def _encoder_available(codec: str, params: tuple[str, ...]) -> bool:
+    """
+    Check (once per encoder) whether ffmpeg can actually encode with it.
+    
+    A tiny test encode is used rather than `ffmpeg -encoders`, since builds
+    often list hardware encoders on machines without a usable device.
+    """
+    try:
+        result = subprocess.run(
+            [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+             "-f", "lavfi", "-i", "nullsrc=s=256x256:d=0.1",
+             "-c:v", codec, *params, "-f", "null", "-"],
+            capture_output=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0
+
+
+def _select_encoder(hwaccel: str = "auto") -> tuple[str, str, list[str]]:
+    """
+    Pick the H.264 encoder for the final write.
+    
+    Args:
+        hwaccel: "auto" for the first working hardware encoder, "cpu" to force
+            libx264, or one of "nvenc", "videotoolbox", "vaapi"
+            
+    Returns:
+        Tuple of (codec, preset, extra_ffmpeg_params)
+        
+    Raises:
+        ValueError: If hwaccel is not recognized
+    """
+    if hwaccel == "cpu":
+        return _CPU_ENCODER
+    if hwaccel == "auto":
+        candidates = list(_HW_ENCODERS)
+    elif hwaccel in _HW_ENCODERS:
+        candidates = [hwaccel]
+    else:
+        raise ValueError(
+            f"Unknown hwaccel: {hwaccel}. Must be 'auto', 'cpu' or one of "
+            f"{tuple(_HW_ENCODERS)}"
+        )
+
+    for name in candidates:
+        codec, preset, params = _HW_ENCODERS[name]
+        if _encoder_available(codec, tuple(params)):
+            return codec, preset, params
+    if hwaccel != "auto":
+        logger.warning(f"{hwaccel} encoder unavailable, falling back to libx264")
+    return _CPU_ENCODER
+
+
+def _temporal_information(clip, fps: int, samples: int = 3) -> float:
+    """
+    Estimate how much a clip moves from a few pairs of consecutive frames.
+    
+    Args:
+        clip: Video clip to probe (e.g. the trimmed background)
+        fps: Frame rate the video will be written at
+        samples: Number of frame pairs to compare (default 3)
+        
+    Returns:
+        Mean absolute luma difference between consecutive frames (0-255)
+    """
+    diffs = []
+    for i in range(samples):
+        t = clip.duration * (i + 0.5) / samples
+        # Every 4th pixel of the green channel is plenty for a motion estimate
+        a = clip.get_frame(t)[::4, ::4, 1].astype(np.int16)
+        b = clip.get_frame(min(t + 1 / fps, clip.duration - 1 / fps))[::4, ::4, 1]
+        diffs.append(np.abs(b - a).mean())
+    return float(np.mean(diffs))
+
+
+def _wav_duration(dialogue_wav: str | bytes) -> float:
+    """
+    Read a PCM WAV's duration from its header, without decoding samples.
+    
+    Args:
+        dialogue_wav: Path to the WAV file, or the WAV bytes
+        
+    Returns:
+        Duration in seconds
+    """
+    source = io.BytesIO(dialogue_wav) if isinstance(dialogue_wav, bytes) else dialogue_wav
+    with wave.open(source) as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def _mux_audio(video_path: str, dialogue_wav: str | bytes, out_path: str) -> None:
+    """
+    Mux the dialogue into a rendered (silent) video as AAC.
+    
+    The video stream is copied as-is; ffmpeg reads the WAV directly (from disk
+    or stdin) instead of MoviePy piping decoded samples through Python.
+    
+    Args:
+        video_path: Rendered video without audio
+        dialogue_wav: Path to the dialogue WAV file, or the WAV bytes
+        out_path: Output path for the final video
+        
+    Raises:
+        RuntimeError: If ffmpeg fails
+    """
+    from_memory = isinstance(dialogue_wav, bytes)
+    result = subprocess.run(
+        [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+         "-i", video_path,
+         "-i", "pipe:0" if from_memory else dialogue_wav,
+         "-map", "0:v:0", "-map", "1:a:0",
+         "-c:v", "copy", "-c:a", "aac",
+         "-movflags", "+faststart",  # better streaming/IG upload
+         out_path],
+        input=dialogue_wav if from_memory else None,
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg mux failed: {result.stderr.decode(errors='replace')}")
+
+
+def _copy_background_with_audio(
+    bg_path: str,
+    dialogue_wav: str | bytes,
+    out_path: str,
+    video_width: int,
+    video_height: int
+) -> bool:
+    """
+    Write a random stretch of the background with the dialogue, copying the
+    video stream as-is (no decode or encode).
+    
+    Args:
+        bg_path: Background video to cut from
+        dialogue_wav: Path to the dialogue WAV file, or the WAV bytes
+        out_path: Output path for the final video
+        video_width: Required video width in pixels
+        video_height: Required video height in pixels
+        
+    Returns:
+        True if the video was written, False if the background isn't already
+        at the target size (the caller then renders it normally)
+    """
+    bg = VideoFileClip(bg_path, audio=False)
+    bg_size, bg_duration = tuple(bg.size), bg.duration
+    bg.close()
+    if bg_size != (video_width, video_height):
+        return False
+
+    audio_duration = _wav_duration(dialogue_wav)
+    start_time = random.uniform(0, max(0, bg_duration - audio_duration - 0.5))
+    from_memory = isinstance(dialogue_wav, bytes)
+    result = subprocess.run(
+        [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+         "-ss", f"{start_time:.3f}", "-i", bg_path,
+         "-i", "pipe:0" if from_memory else dialogue_wav,
+         "-t", f"{audio_duration:.3f}",
+         "-map", "0:v:0", "-map", "1:a:0",
+         "-c:v", "copy", "-c:a", "aac", "-shortest",
+         "-movflags", "+faststart",
+         out_path],
+        input=dialogue_wav if from_memory else None,
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg copy failed: {result.stderr.decode(errors='replace')}")
+    return True
+
 
 def assemble_video(
-    dialogue_wav_path: str,
+    dialogue_wav: str | bytes,
     bg_folder: str,
     out_path: str,
     speaker_timings: list[tuple[str, float, float]],
@@ -18,92 +244,181 @@ def assemble_video(
     font_path: str,
     title: str,
     fps: int = 30,
-    bitrate: str = "6M",
+    bitrate: str | None = None,
     video_width: int = 1080,
     video_height: int = 1920,
+    bg_path: str | None = None,
+    hwaccel: str = "auto",
 ):
     """
     Assemble a complete video with background, title, overlays, and captions.
     
     Args:
-        dialogue_wav_path: Path to dialogue audio file
+        dialogue_wav: Path to the dialogue WAV file (16-bit PCM), or the WAV
+            bytes themselves (piped to ffmpeg, without a temp file)
         bg_folder: Folder containing background videos
         out_path: Output path for final video
         speaker_timings: List of (speaker, start_time, end_time) tuples
         pngs_folder: Folder containing PNG overlay images
         word_alignments: List of (word, start_time, end_time) tuples
         font_path: Path to font file
-        title: Title text to display
+        title: Title text to display (empty for no title)
         fps: Frames per second (default 30)
-        bitrate: Video bitrate (default "6M")
+        bitrate: Fixed video bitrate, e.g. "6M" (default: constant quality,
+            capped at VIDEO_MAXRATE)
         video_width: Video width in pixels (default 1080)
         video_height: Video height in pixels (default 1920)
+        bg_path: Background already chosen with select_background (default:
+            pick a random one from bg_folder)
+        hwaccel: Encoder backend: "auto" (first working hardware encoder),
+            "cpu", "nvenc", "videotoolbox" or "vaapi" (default "auto")
     """
-    # Load audio
-    voice = AudioFileClip(dialogue_wav_path)
-    audio_duration = voice.duration
+    # Nothing to draw over the background: cut it and mux the audio without
+    # re-encoding the video
+    if not title and not word_alignments and not speaker_timings:
+        if bg_path is None:
+            bg_path = select_background(bg_folder, video_width, video_height)
+        if _copy_background_with_audio(
+            bg_path, dialogue_wav, out_path, video_width, video_height
+        ):
+            return
+
+    # Background selection (ffprobe/pre-scale), PNG decoding and caption
+    # rendering don't depend on each other or on the audio, so overlap them
+    # with reading the audio length and rendering the title
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        if bg_path is None:
+            bg_future = executor.submit(
+                select_background, bg_folder, video_width, video_height
+            )
+
+        # Create overlay clips
+        overlays_future = executor.submit(
+            create_overlay_clips,
+            speaker_timings=speaker_timings,
+            pngs_folder=pngs_folder,
+            video_width=video_width,
+            video_height=video_height
+        )
+
+        # Create caption clips
+        captions_future = executor.submit(
+            create_caption_clips,
+            word_alignments=word_alignments,
+            speaker_timings=speaker_timings,
+            font_path=font_path
+        )
+
+        # Only the audio's length is needed here; the samples are muxed in
+        # by ffmpeg after the video is rendered
+        audio_duration = _wav_duration(dialogue_wav)
+
+        # Create title clip (none for an empty title)
+        title_clips = [create_title_clip(
+            title=title,
+            font_path=font_path,
+            audio_duration=audio_duration
+        )] if title else []
+
+        if bg_path is None:
+            bg_path = bg_future.result()
+        overlay_clips = overlays_future.result()
+        text_clips = captions_future.result()
 
     # Prepare background clip
     bg, bg_v = prepare_background_clip(
-        bg_folder, audio_duration, video_width, video_height
+        bg_folder, audio_duration, video_width, video_height, bg_path
     )
     
-    # Create base clip with audio
-    base_clip = bg_v.subclipped(0, audio_duration).with_audio(voice)
-
-    # Create title clip
-    title_clip = create_title_clip(
-        title=title,
-        font_path=font_path,
-        audio_duration=audio_duration
-    )
-
-    # Create overlay clips
-    overlay_clips = create_overlay_clips(
-        speaker_timings=speaker_timings,
-        pngs_folder=pngs_folder,
-        video_width=video_width,
-        video_height=video_height
-    )
-
-    # Create caption clips
-    text_clips = create_caption_clips(
-        word_alignments=word_alignments,
-        speaker_timings=speaker_timings,
-        font_path=font_path
-    )
-
-    # Composite all clips together
+    # Composite all clips together. The background is opaque and full-frame,
+    # so use it as the canvas instead of blitting it onto a blank one every
+    # frame.
     final = CompositeVideoClip(
-        [base_clip, title_clip] + overlay_clips + text_clips
-    )
+        [bg_v] + title_clips + overlay_clips + text_clips,
+        use_bgclip=True
+    ).with_duration(audio_duration)
 
-    # Write MP4 (H.264 + AAC)
-    final.write_videofile(
-        out_path,
-        fps=fps,
-        codec="libx264",
-        audio_codec="aac",
-        bitrate=bitrate,
-        preset="medium",
-        threads=4,
-        write_logfile=False,
-        ffmpeg_params=[
-            "-movflags",
-            "+faststart",  # better streaming/IG upload
-            "-vsync",
-            "cfr",  # constant frame rate to prevent frame freezing
-        ],
+    # Write the H.264 video (no audio) next to the output, then mux in the
+    # dialogue as AAC; use a hardware encoder when there is one
+    codec, preset, encoder_params = _select_encoder(hwaccel)
+    if codec == "libx264" and _temporal_information(bg_v, fps) > X264_HIGH_MOTION_TI:
+        preset = "medium"
+    if bitrate is None:
+        encoder_params = encoder_params + _RATE_CONTROL[codec] + _RATE_CAP
+    fd, video_only_path = tempfile.mkstemp(
+        suffix=".mp4", dir=os.path.dirname(os.path.abspath(out_path))
     )
+    os.close(fd)
+    try:
+        final.write_videofile(
+            video_only_path,
+            fps=fps,
+            codec=codec,
+            audio=False,
+            bitrate=bitrate,
+            preset=preset,
+            threads=0,  # let the encoder pick its thread count
+            write_logfile=False,
+            ffmpeg_params=encoder_params + [
+                "-vsync",
+                "cfr",  # constant frame rate to prevent frame freezing
+            ],
+        )
+        _mux_audio(video_only_path, dialogue_wav, out_path)
+    finally:
+        os.unlink(video_only_path)
 
     # Cleanup
-    voice.close()
     bg.close()
     bg_v.close()
     final.close()
-    title_clip.close()
+    for clip in title_clips:
+        clip.close()
     for clip in overlay_clips:
         clip.close()
     for clip in text_clips:
         clip.close()
 
+
+# Reels are assembled in worker processes that are replaced every
+# ASSEMBLE_TASKS_PER_WORKER reels: MoviePy/ffmpeg buffers that outlive close()
+# are returned to the OS when one exits, so a long-running server's memory
+# doesn't creep up, while a worker's caches (encoder probes, background
+# index, fonts, rendered captions) are reused by the reels in between
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Create the worker pool on first use (once, even from several threads)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=ASSEMBLE_WORKERS,
+                max_tasks_per_child=ASSEMBLE_TASKS_PER_WORKER,
+                # Probe the hardware encoders before the first reel
+                initializer=_select_encoder,
+            )
+        return _pool
+
+
+def assemble_video_isolated(**kwargs) -> None:
+    """
+    Run assemble_video in a worker process and wait for it.
+    
+    Takes the same keyword arguments as assemble_video. Meant for long-running
+    servers; one-off scripts can call assemble_video directly.
+    """
+    global _pool
+    pool = _get_pool()
+    try:
+        pool.submit(assemble_video, **kwargs).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); replace the pool so later reels
+        # don't all fail with the same error
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
@@ -1,12 +1,32 @@
 """
 Background video processing and preparation.
 """
+import fcntl
+import logging
+import math
 import random
+import re
 import os
+import subprocess
+import tempfile
 from glob import glob
 from moviepy import VideoFileClip, AudioFileClip
 from moviepy import vfx
-from typing import Tuple
+from moviepy.config import FFMPEG_BINARY
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Where pre-scaled copies go when the background folder is read-only
+BG_CACHE_DIR = os.getenv(
+    "BG_CACHE_DIR", os.path.join(tempfile.gettempdir(), "reels-backgrounds")
+)
+
+# Pre-scaled copies are named "<name>.<w>x<h>.v<version>.mp4". Bump the
+# version when the transcode settings change so stale copies are rebuilt;
+# older copies (any version, or none) still never count as sources.
+_VERTICAL_VERSION = 2
+_VERTICAL_SUFFIX = re.compile(r"\.\d+x\d+(?:\.v\d+)?\.mp4$")
 
 
 def make_vertical(
@@ -25,12 +45,13 @@ def make_vertical(
     Returns:
         Vertically formatted video clip
     """
-    # First, scale to ensure height >= target_h
-    scaled = bg_clip.with_effects([vfx.Resize(height=target_h)])
-
-    # If width is still < target_w, scale by width instead
-    if scaled.w < target_w:
-        scaled = bg_clip.with_effects([vfx.Resize(width=target_w)])
+    # One resize by the larger of the two ratios, so both sides cover the target
+    scale = max(target_h / bg_clip.h, target_w / bg_clip.w)
+    new_size = (
+        max(target_w, math.ceil(bg_clip.w * scale)),
+        max(target_h, math.ceil(bg_clip.h * scale)),
+    )
+    scaled = bg_clip.with_effects([vfx.Resize(new_size=new_size)])
     
     # Center-crop to exact target dimensions
     x_center = scaled.w / 2
@@ -43,39 +64,209 @@ def make_vertical(
     return cropped
 
 
-def prepare_background_clip(
+# Per-process indexes: source videos per folder (with the folder's mtime
+# when it was scanned), and the pre-scaled copy for each (source, width,
+# height). Filled on first use, so later videos in the same process skip the
+# folder scan and the exists() checks. Adding or removing a file changes the
+# folder's mtime, which triggers a rescan, so a long-running process picks up
+# new backgrounds.
+_sources: dict[str, tuple[float, list[str]]] = {}
+_vertical_paths: dict[tuple[str, int, int], str] = {}
+
+
+def _background_sources(bg_folder: str) -> list[str]:
+    """List source background videos, excluding pre-scaled copies."""
+    try:
+        mtime = os.stat(bg_folder).st_mtime
+    except OSError:
+        return []
+    scanned = _sources.get(bg_folder)
+    if scanned is not None and scanned[0] == mtime and scanned[1]:
+        return scanned[1]
+
+    # Forget resolved copies from this folder too; they may have been removed
+    folder = os.path.abspath(bg_folder)
+    for key in [key for key in _vertical_paths
+                if os.path.dirname(os.path.abspath(key[0])) == folder]:
+        del _vertical_paths[key]
+    sources = [
+        path for path in glob(os.path.join(bg_folder, "*.mp4"))
+        if not _VERTICAL_SUFFIX.search(path)
+    ]
+    _sources[bg_folder] = (mtime, sources)
+    return sources
+
+
+def _transcode_vertical(
+    src_path: str,
+    candidates: list[str],
+    target_w: int,
+    target_h: int
+) -> Optional[str]:
+    """Transcode the pre-scaled copy into the first writable candidate path."""
+    logger.info(f"Pre-scaling background {src_path} to {target_w}x{target_h}")
+    for dst_path in candidates:
+        try:
+            # Write to a temp file and rename, so a partial file is never picked up
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(dst_path))
+            os.close(fd)
+        except OSError as e:
+            logger.warning(f"Cannot cache pre-scaled background in {os.path.dirname(dst_path)}: {e}")
+            continue
+        try:
+            subprocess.run(
+                [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+                 "-i", src_path, "-an",
+                 "-vf", f"scale={target_w}:{target_h}:force_original_aspect_ratio=increase,"
+                        f"crop={target_w}:{target_h},setsar=1",
+                 # Square pixels and 4:2:0, so the copy can also be shipped
+                 # as-is by the stream-copy path
+                 "-c:v", "libx264", "-preset", "slow", "-crf", "18",
+                 "-pix_fmt", "yuv420p",
+                 "-movflags", "+faststart", "-f", "mp4", tmp_path],
+                check=True,
+                capture_output=True,
+            )
+            os.replace(tmp_path, dst_path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            # ffmpeg itself failed; another folder won't help
+            logger.warning(f"Failed to pre-scale background {src_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return None
+        return dst_path
+    return None
+
+
+def ensure_vertical(
+    src_path: str,
+    target_w: int = 1080,
+    target_h: int = 1920
+) -> Optional[str]:
+    """
+    Get a copy of a background video already scaled and cropped to the target.
+    
+    The copy is transcoded once with ffmpeg on first use and reused after that,
+    so later runs skip the per-frame resize/crop entirely. It is written next
+    to the source, or to BG_CACHE_DIR when that folder is read-only. A lock
+    file makes sure only one process transcodes a given copy; others wait for
+    it and reuse the result.
+    
+    Args:
+        src_path: Source background video
+        target_w: Target width (default 1080)
+        target_h: Target height (default 1920)
+        
+    Returns:
+        Path to the pre-scaled copy, or None if it could not be created
+    """
+    cached = _vertical_paths.get((src_path, target_w, target_h))
+    if cached is not None:
+        return cached
+
+    root, _ = os.path.splitext(os.path.abspath(src_path))
+    name = f"{os.path.basename(root)}.{target_w}x{target_h}.v{_VERTICAL_VERSION}.mp4"
+    # Next to the source if that folder is writable, else in the cache dir
+    candidates = [
+        os.path.join(os.path.dirname(root), name),
+        os.path.join(BG_CACHE_DIR, name),
+    ]
+    dst_path = next((path for path in candidates if os.path.exists(path)), None)
+    if dst_path is None:
+        os.makedirs(BG_CACHE_DIR, exist_ok=True)
+        with open(os.path.join(BG_CACHE_DIR, f"{name}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another process may have finished the copy while we waited
+            dst_path = next(
+                (path for path in candidates if os.path.exists(path)), None
+            ) or _transcode_vertical(src_path, candidates, target_w, target_h)
+
+    if dst_path is not None:
+        _vertical_paths[(src_path, target_w, target_h)] = dst_path
+    return dst_path
+
+
+def prepare_vertical_backgrounds(
     bg_folder: str,
-    audio_duration: float,
     target_w: int = 1080,
     target_h: int = 1920
-) -> Tuple[VideoFileClip, VideoFileClip]:
+) -> None:
     """
-    Select and prepare a background video clip to match audio duration.
+    Pre-scale every background video in a folder (e.g. at startup).
+    
+    Args:
+        bg_folder: Folder containing background video files
+        target_w: Target width (default 1080)
+        target_h: Target height (default 1920)
+    """
+    for src_path in _background_sources(bg_folder):
+        ensure_vertical(src_path, target_w, target_h)
+
+
+def select_background(
+    bg_folder: str,
+    target_w: int = 1080,
+    target_h: int = 1920
+) -> str:
+    """
+    Pick a random background video, pre-scaling it if needed.
+    
+    This doesn't depend on the audio, so callers can run it ahead of time
+    (e.g. while the script is being generated) and pass the result on.
     
     Args:
         bg_folder: Folder containing background video files
-        audio_duration: Duration of the audio in seconds
         target_w: Target width (default 1080)
         target_h: Target height (default 1920)
         
     Returns:
-        Tuple of (base_clip_with_audio, background_clip)
+        Path to load: the pre-scaled copy, or the source if that failed
     """
-    # Pick a random background video
-    choices = glob(os.path.join(bg_folder, "*.mp4"))
+    choices = _background_sources(bg_folder)
     if not choices:
         raise RuntimeError(f"No background MP4s found in {bg_folder}")
     bg_path = random.choice(choices)
+    return ensure_vertical(bg_path, target_w, target_h) or bg_path
 
-    bg = VideoFileClip(bg_path).without_audio()
 
-    # Make vertical 1080x1920
-    bg_v = make_vertical(bg, target_w, target_h)
+def prepare_background_clip(
+    bg_folder: str,
+    audio_duration: float,
+    target_w: int = 1080,
+    target_h: int = 1920,
+    bg_path: Optional[str] = None
+) -> Tuple[VideoFileClip, VideoFileClip]:
+    """
+    Select and prepare a background video clip trimmed to the audio duration.
+    
+    Args:
+        bg_folder: Folder containing background video files
+        audio_duration: Duration of the audio in seconds
+        target_w: Target width (default 1080)
+        target_h: Target height (default 1920)
+        bg_path: Background already chosen by select_background (default:
+            pick one now)
+        
+    Returns:
+        Tuple of (base_clip_with_audio, background_clip)
+    """
+    # Pick a random background video (pre-scaled when possible)
+    if bg_path is None:
+        bg_path = select_background(bg_folder, target_w, target_h)
+    bg = VideoFileClip(bg_path).without_audio()
 
-    # Select a random start point and trim to match audio length
+    # Select a random start point and trim to the audio length in one step,
+    # before scaling, so only the frames that are used get processed
     duration = audio_duration + 0.5  # small pad for video
-    start_time = random.uniform(0, max(0, bg_v.duration - duration))
-    bg_v = bg_v.subclipped(start_time)
+    start_time = random.uniform(0, max(0, bg.duration - duration))
+    trimmed = bg.subclipped(start_time, start_time + audio_duration)
+
+    # Make vertical 1080x1920 (already done for a pre-scaled copy)
+    if tuple(bg.size) == (target_w, target_h):
+        bg_v = trimmed
+    else:
+        bg_v = make_vertical(trimmed, target_w, target_h)
 
     return bg, bg_v
 
@@ -1,26 +1,35 @@
 """
 Caption chunking and rendering logic.
 """
-from moviepy import TextClip
-from typing import List, Optional
-from .utils import get_speaker_at_time
-from .title import check_text_wraps
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw
+from moviepy import ImageClip, VideoClip
+from typing import Iterator, List, Optional
+from .utils import annotate_speakers
+from .fontcache import get_font
+from .title import check_text_wraps, measure_width
 from .effects import add_landing_effect
 
 
 class CaptionChunk:
-    """Represents a chunk of words to be displayed as a caption."""
+    """Represents a chunk of (upper-cased) words to be displayed as a caption."""
+    __slots__ = ("words", "start_time", "end_time", "speaker", "text")
+
     def __init__(
         self,
         words: List[str],
         start_time: float,
         end_time: float,
-        speaker: Optional[str] = None
+        speaker: Optional[str] = None,
+        text: Optional[str] = None
     ):
         self.words = words
         self.start_time = start_time
         self.end_time = end_time
         self.speaker = speaker
+        # The caption line; chunk_words passes the text it already built
+        self.text = text if text is not None else " ".join(words)
 
 
 def chunk_words(
@@ -30,10 +39,13 @@ def chunk_words(
     font_size: int,
     text_width: int,
     stroke_width: int
-) -> List[CaptionChunk]:
+) -> Iterator[CaptionChunk]:
     """
     Group words into chunks based on wrapping and speaker changes.
     
+    Chunks are yielded as soon as they are closed, so a consumer can start
+    rendering before the whole transcript has been chunked.
+    
     Args:
         word_alignments: List of (word, start_time, end_time) tuples
         speaker_timings: List of (speaker, start_time, end_time) tuples
@@ -42,20 +54,44 @@ def chunk_words(
         text_width: Maximum text width
         stroke_width: Stroke width for text
         
-    Returns:
-        List of CaptionChunk objects
+    Yields:
+        CaptionChunk objects, in time order
     """
-    chunks = []
+    # Measure each distinct word once; a line's width is then the running sum
+    # of its word widths plus the spaces between them
+    space_width = measure_width(" ", font_path, font_size)
+    max_line_width = text_width - 2 * stroke_width
+
+    # Speakers are matched to words in one sweep over both (time-ordered) lists
+    annotated = annotate_speakers(word_alignments, speaker_timings)
+
+    # Fast path: with no speaker changes and a transcript that fits on one
+    # line, the whole thing is a single chunk; skip the per-word layout
+    if len(speaker_timings) <= 1 and word_alignments:
+        annotated = list(annotated)
+        if len({speaker for *_, speaker in annotated}) == 1:
+            words = [word.upper() for word, *_ in annotated]
+            text = " ".join(words)
+            if measure_width(text, font_path, font_size) <= max_line_width:
+                yield CaptionChunk(
+                    words,
+                    annotated[0][1],
+                    annotated[-1][2],
+                    annotated[0][3],
+                    text
+                )
+                return
+
     current_chunk_words = []
+    current_chunk_text = ""  # the current chunk's line, built word by word
+    current_chunk_width = 0.0  # rendered width of the current chunk's line
     chunk_start_time = None
     chunk_end_time = None
     current_chunk_speaker = None
 
-    for word, start_time, end_time in word_alignments:
-        # Determine which speaker is speaking for this word
-        word_speaker = None
-        if speaker_timings:
-            word_speaker = get_speaker_at_time(speaker_timings, start_time)
+    for word, start_time, end_time, word_speaker in annotated:
+        # Captions are shown in capitals; convert each word once, up front
+        word = word.upper()
         
         # Check if speaker changed
         speaker_changed = False
@@ -68,14 +104,17 @@ def chunk_words(
         # If speaker changed, finalize current chunk first
         if speaker_changed:
             if current_chunk_words:
-                chunks.append(CaptionChunk(
+                yield CaptionChunk(
                     current_chunk_words,
                     chunk_start_time,
                     chunk_end_time,
-                    current_chunk_speaker
-                ))
+                    current_chunk_speaker,
+                    current_chunk_text
+                )
             # Start new chunk
             current_chunk_words = []
+            current_chunk_text = ""
+            current_chunk_width = 0.0
             chunk_start_time = start_time
             chunk_end_time = end_time
             current_chunk_speaker = word_speaker
@@ -86,44 +125,109 @@ def chunk_words(
             chunk_end_time = end_time
             current_chunk_speaker = word_speaker
         
-        # Test if adding this word causes wrapping
-        test_words = current_chunk_words + [word]
-        test_text = " ".join(test_words).upper()
-        
         # Check if adding this word causes wrapping
-        wraps = check_text_wraps(
-            test_text, font_path, font_size, text_width, stroke_width, 'center'
-        )
+        word_width = measure_width(word, font_path, font_size)
+        if current_chunk_words:
+            test_width = current_chunk_width + space_width + word_width
+        else:
+            test_width = word_width
+        wraps = test_width > max_line_width
         
         if wraps and current_chunk_words:
             # Adding this word causes wrapping, so finalize current chunk without this word
-            chunks.append(CaptionChunk(
+            yield CaptionChunk(
                 current_chunk_words,
                 chunk_start_time,
                 chunk_end_time,
-                current_chunk_speaker
-            ))
+                current_chunk_speaker,
+                current_chunk_text
+            )
             
             # Start new chunk with this word
             current_chunk_words = [word]
+            current_chunk_text = word
+            current_chunk_width = word_width
             chunk_start_time = start_time
             chunk_end_time = end_time
             current_chunk_speaker = word_speaker
         else:
             # Word fits, add it to current chunk
             current_chunk_words.append(word)
+            current_chunk_text = (
+                f"{current_chunk_text} {word}" if current_chunk_text else word
+            )
+            current_chunk_width = test_width
             chunk_end_time = end_time
     
     # Create chunk for remaining words if any
     if current_chunk_words:
-        chunks.append(CaptionChunk(
+        yield CaptionChunk(
             current_chunk_words,
             chunk_start_time,
             chunk_end_time,
-            current_chunk_speaker
-        ))
+            current_chunk_speaker,
+            current_chunk_text
+        )
+
+
+@lru_cache(maxsize=256)
+def render_caption_png(
+    text: str,
+    font_path: str,
+    font_size: int,
+    font_color: str,
+    stroke_color: str,
+    stroke_width: int
+) -> np.ndarray:
+    """
+    Rasterize one line of caption text with PIL.
+    
+    The canvas is cropped to the text's bounding box (stroke included), so it
+    is small and can be cached; identical captions reuse the same pixels.
+    
+    Args:
+        text: Text to draw (a single line)
+        font_path: Path to font file
+        font_size: Font size in pixels
+        font_color: Text color
+        stroke_color: Stroke color
+        stroke_width: Stroke width
+        
+    Returns:
+        Read-only RGBA pixel array
+    """
+    font = get_font(font_path, font_size)
+    left, top, right, bottom = font.getbbox(text, stroke_width=stroke_width)
+    img = Image.new("RGBA", (max(right - left, 1), max(bottom - top, 1)))
+    ImageDraw.Draw(img).text(
+        (-left, -top), text, font=font, fill=font_color,
+        stroke_width=stroke_width, stroke_fill=stroke_color
+    )
+    pixels = np.asarray(img)
+    pixels.flags.writeable = False
+    return pixels
+
+
+@lru_cache(maxsize=256)
+def _animated_caption(
+    text: str,
+    font_path: str,
+    font_size: int,
+    font_color: str,
+    stroke_color: str,
+    stroke_width: int
+) -> VideoClip:
+    """
+    Build the centred, landing-animated clip for a caption (no duration set).
     
-    return chunks
+    Cached, so a repeated caption reuses both the rendered text and the
+    pre-scaled landing frames; callers give each use its own duration.
+    """
+    frame = render_caption_png(
+        text, font_path, font_size, font_color, stroke_color, stroke_width
+    )
+    txt_clip = ImageClip(frame).with_position(('center', 'center'))
+    return add_landing_effect(txt_clip, 0.15)
 
 
 def create_caption_clip(
@@ -133,8 +237,9 @@ def create_caption_clip(
     font_color: str = 'yellow',
     stroke_color: str = 'black',
     stroke_width: int = 2,
-    text_width: int = 960
-) -> TextClip:
+    text_width: int = 960,
+    start_offset: float = 0.0
+) -> VideoClip:
     """
     Create a text clip from a caption chunk.
     
@@ -146,46 +251,53 @@ def create_caption_clip(
         stroke_color: Stroke color
         stroke_width: Stroke width
         text_width: Maximum text width
+        start_offset: Offset applied to the chunk's start time
         
     Returns:
-        TextClip configured for caption display
+        Clip configured for caption display, placed at its start time
     """
     if not chunk.words:
         return None
     
-    chunk_text = " ".join(chunk.words).upper()
+    chunk_text = chunk.text
     
-    # If single word, shrink font until it fits
-    if len(chunk.words) == 1:
-        adjusted_font_size = font_size
-        while adjusted_font_size >= 20:
-            if not check_text_wraps(
-                chunk_text, font_path, adjusted_font_size, text_width,
-                stroke_width, 'center'
-            ):
-                break  # Fits on one line
-            adjusted_font_size -= 15
-        adjusted_font_size = max(adjusted_font_size, 20)
-    else:
-        # Multiple words - use default font size
-        adjusted_font_size = font_size
-
-    txt_clip = TextClip(
-        text=chunk_text,
-        font=font_path,
-        duration=chunk.end_time - chunk.start_time,
-        color=font_color,
-        stroke_color=stroke_color,
-        stroke_width=stroke_width,
-        method='caption',
-        font_size=adjusted_font_size,
-        size=(text_width, 1800),  # Single line, auto height
-        text_align='center'
+    # If single word, shrink font until it fits. Glyph widths scale linearly
+    # with font size (the stroke doesn't), so one measurement at the default
+    # size gives the largest size that fits.
+    adjusted_font_size = font_size
+    if len(chunk.words) == 1 and check_text_wraps(
+        chunk_text, font_path, font_size, text_width, stroke_width, 'center'
+    ):
+        left, _, right, _ = get_font(font_path, font_size).getbbox(chunk_text)
+        estimate = max(
+            int(font_size * (text_width - 2 * stroke_width) / (right - left)), 20
+        )
+        # Hinting can make the scaled size a little too wide; if so, binary
+        # search [20, estimate] for the largest size that fits
+        adjusted_font_size = estimate
+        if check_text_wraps(
+            chunk_text, font_path, estimate, text_width, stroke_width, 'center'
+        ):
+            lo, hi = 20, estimate - 1
+            adjusted_font_size = 20
+            while lo <= hi:
+                mid = (lo + hi) // 2
+                if check_text_wraps(
+                    chunk_text, font_path, mid, text_width,
+                    stroke_width, 'center'
+                ):
+                    hi = mid - 1
+                else:
+                    adjusted_font_size = mid
+                    lo = mid + 1
+
+    txt_clip = _animated_caption(
+        chunk_text, font_path, adjusted_font_size,
+        font_color, stroke_color, stroke_width
+    )
+    return txt_clip.with_duration(chunk.end_time - chunk.start_time).with_start(
+        chunk.start_time + start_offset
     )
-    
-    txt_clip = txt_clip.with_position(('center', 'center'))
-    txt_clip = add_landing_effect(txt_clip, 0.15)
-    return txt_clip
 
 
 def create_caption_clips(
@@ -198,7 +310,7 @@ def create_caption_clips(
     stroke_width: int = 2,
     text_width: int = 960,
     start_offset: float = -0.1
-) -> List[TextClip]:
+) -> List[VideoClip]:
     """
     Create all caption clips from word alignments.
     
@@ -214,29 +326,24 @@ def create_caption_clips(
         start_offset: Offset to apply to start times (default -0.1)
         
     Returns:
-        List of TextClip objects for captions
+        List of clips for captions
     """
-    # Chunk words based on wrapping and speaker changes
+    # Chunk words based on wrapping and speaker changes; chunks are produced
+    # lazily and each is rendered as soon as it closes
     chunks = chunk_words(
         word_alignments, speaker_timings, font_path,
         font_size, text_width, stroke_width
     )
     
-    # Create clips from chunks
-    text_clips_with_timing = []
+    # Create clips from chunks; identical captions share one rendered frame
+    text_clips = []
     for chunk in chunks:
-        txt_clip = create_caption_clip(
+        clip = create_caption_clip(
             chunk, font_path, font_size, font_color,
-            stroke_color, stroke_width, text_width
+            stroke_color, stroke_width, text_width, start_offset
         )
-        if txt_clip:
-            text_clips_with_timing.append((txt_clip, chunk.start_time))
-    
-    # Apply start_time offset to text clips
-    text_clips = [
-        clip.with_start(start_time + start_offset)
-        for clip, start_time in text_clips_with_timing
-    ]
+        if clip:
+            text_clips.append(clip)
     
     return text_clips
 
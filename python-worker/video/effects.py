@@ -1,43 +1,91 @@
 """
 Video effects and animations.
 """
-from moviepy import VideoClip
-from moviepy import vfx
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+from moviepy import ImageClip, VideoClip
 from .utils import ease_out_cubic
 
 
+def _scale_image(pixels: np.ndarray, scale: float) -> np.ndarray:
+    """Resize a uint8 (RGB or single-channel) array by `scale` with PIL."""
+    h, w = pixels.shape[:2]
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return np.asarray(Image.fromarray(pixels).resize(size, Image.Resampling.LANCZOS))
+
+
+@lru_cache(maxsize=8)
+def _landing_scales(landing_dur: float, fps: int) -> tuple[float, ...]:
+    """
+    Zoom factor at each frame of a landing animation, from 75% to (just
+    under) 100%. Every caption uses the same duration, so this is computed
+    once per video instead of once per clip.
+    """
+    steps = max(1, int(landing_dur * fps))
+    return tuple(0.75 + 0.25 * ease_out_cubic(i / steps) for i in range(steps))
+
+
 def add_landing_effect(
-    clip: VideoClip,
+    clip: ImageClip,
     landing_dur: float = 0.25,
-    base_y: str = 'center'
+    base_y: str = 'center',
+    fps: int = 30
 ) -> VideoClip:
     """
     Adds a zoom-in + fade-in effect at the start of the clip.
     - No vertical movement.
     - Scale goes from 0.75 -> 1.0 over `landing_dur`.
     
+    The clip is a still image, so the few scaled frames of the animation are
+    rendered once up front and looked up per frame, instead of resizing the
+    image in a per-frame callback.
+    
     Args:
-        clip: Video clip to animate
+        clip: Still image clip to animate (e.g. a caption)
         landing_dur: Duration of landing animation in seconds
         base_y: Vertical position ('center', 'top', 'bottom', or pixel value)
+        fps: Frame rate the animation is sampled at (default 30)
         
     Returns:
         Animated clip with landing effect
     """
-    # Fix the position (no time-based movement)
-    animated = clip.with_position(('center', base_y))
+    # Scale (zoom) at each frame of the first `landing_dur` seconds; the frame
+    # after the last entry is the full-size image
+    scales = _landing_scales(landing_dur, fps)
+    steps = len(scales)
 
-    # Animate scale (zoom) over the first `landing_dur` seconds
-    def scale_fn(t):
-        # t is local to the clip (0 at clip.start)
-        if t < 0:
-            return 0.75
-        if t > landing_dur:
-            return 1.0
-        alpha = ease_out_cubic(t / landing_dur)  # 0 -> 1 smoothly
-        return 0.75 + 0.25 * alpha  # zoom from 75% to 100%
+    image = clip.get_frame(0)
+    frames = [_scale_image(image, scale) for scale in scales] + [image]
+    if clip.mask is not None:
+        alpha = clip.mask.get_frame(0).astype(np.float32)
+        # Resample the mask as 8-bit: LANCZOS on a float image overshoots
+        # outside [0, 1] at the edges, which MoviePy's uint8 conversion then
+        # wraps into speckled halos
+        alpha8 = np.rint(alpha * 255).astype(np.uint8)
+        masks = [
+            _scale_image(alpha8, scale).astype(np.float32) / 255
+            for scale in scales
+        ] + [alpha]
+    else:
+        masks = None
 
-    animated = animated.with_effects([vfx.Resize(lambda t: scale_fn(t))])
+    def index(t):
+        # t is local to the clip (0 at clip.start)
+        return min(max(int(t * fps), 0), steps)
 
-    return animated
+    animated = VideoClip(
+        frame_function=lambda t: frames[index(t)],
+        duration=clip.duration,
+        has_constant_size=False
+    )
+    if masks is not None:
+        animated = animated.with_mask(VideoClip(
+            frame_function=lambda t: masks[index(t)],
+            is_mask=True,
+            duration=clip.duration,
+            has_constant_size=False
+        ))
 
+    # Fix the position (no time-based movement)
+    return animated.with_position(('center', base_y))
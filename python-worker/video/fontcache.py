@@ -0,0 +1,24 @@
+"""
+Shared font registry for text measurement and rendering.
+"""
+from functools import lru_cache
+from PIL import ImageFont
+
+
+@lru_cache(maxsize=64)
+def get_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+    """
+    Open a TrueType font at a given size, parsing the file once per size.
+    
+    Every caption/title measurement and caption render goes through here, so
+    the font tables are shared instead of re-read per call. (MoviePy's
+    TextClip opens the font itself; prefer Pillow for measurement-only work.)
+    
+    Args:
+        font_path: Path to font file
+        font_size: Font size in pixels
+        
+    Returns:
+        Cached FreeTypeFont instance
+    """
+    return ImageFont.truetype(font_path, font_size)
@@ -2,10 +2,44 @@
 PNG overlay handling for speaker images.
 """
 import os
+from functools import lru_cache
+import numpy as np
+from PIL import Image
 from moviepy import ImageClip, VideoFileClip
-from moviepy import vfx
 from typing import List
 
+# Speaker -> (PNG file, side of the frame it sits on)
+_CHARACTERS = {
+    "peter": ("Peter_Griffin.png", "left"),
+    "stewie": ("Stewie_Griffin.png", "right"),
+}
+
+
+def _png_size(png_path: str) -> tuple[int, int]:
+    """Read a PNG's (width, height) from its header, without decoding pixels."""
+    with Image.open(png_path) as img:
+        return img.size
+
+
+@lru_cache(maxsize=8)
+def _resized_png(png_path: str, width: int, height: int) -> np.ndarray:
+    """
+    Decode and resize a PNG once per process.
+    
+    Args:
+        png_path: Path to the PNG image
+        width: Target width in pixels
+        height: Target height in pixels
+        
+    Returns:
+        Read-only RGBA pixel array at the target size
+    """
+    with Image.open(png_path) as img:
+        resized = img.convert("RGBA").resize((width, height), Image.Resampling.LANCZOS)
+    pixels = np.asarray(resized)
+    pixels.flags.writeable = False
+    return pixels
+
 
 def create_overlay_clips(
     speaker_timings: list[tuple[str, float, float]],
@@ -30,58 +64,34 @@ def create_overlay_clips(
     overlay_clips = []
     target_png_height = int(video_height * target_png_height_ratio)
 
-    # Load PNG images
-    peter_png_path = os.path.join(pngs_folder, "Peter_Griffin.png")
-    stewie_png_path = os.path.join(pngs_folder, "Stewie_Griffin.png")
-
-    if not os.path.exists(peter_png_path):
-        raise FileNotFoundError(f"Peter PNG not found at {peter_png_path}")
-    if not os.path.exists(stewie_png_path):
-        raise FileNotFoundError(f"Stewie PNG not found at {stewie_png_path}")
-
-    # Get original image dimensions to calculate proportional scaling
-    peter_img = ImageClip(peter_png_path)
-    stewie_img = ImageClip(stewie_png_path)
+    # Per-character geometry is fixed for the whole video, so build one
+    # resized, positioned clip per character up front; each line is then a
+    # shallow copy of it that shares the same pixel buffer
+    char_clips = {}
+    for speaker, (filename, side) in _CHARACTERS.items():
+        png_path = os.path.join(pngs_folder, filename)
+        if not os.path.exists(png_path):
+            raise FileNotFoundError(f"{speaker.capitalize()} PNG not found at {png_path}")
 
-    # Calculate scale factors based on target height
-    peter_scale = target_png_height / peter_img.h
-    stewie_scale = target_png_height / stewie_img.h
+        # Scale proportionally to the target height (size read from the header)
+        png_w, png_h = _png_size(png_path)
+        png_width = int(png_w * target_png_height / png_h)
+        png_height = target_png_height
 
-    # Calculate proportional widths
-    peter_width = int(peter_img.w * peter_scale)
-    peter_height = target_png_height
-    stewie_width = int(stewie_img.w * stewie_scale)
-    stewie_height = target_png_height
-
-    # Close temporary clips used for dimension checking
-    peter_img.close()
-    stewie_img.close()
+        x_pos = 0 if side == "left" else video_width - png_width
+        y_pos = video_height - png_height  # bottom alignment for both
+        char_clips[speaker] = ImageClip(
+            _resized_png(png_path, png_width, png_height)
+        ).with_position((x_pos, y_pos))
 
-    # Create overlay clips for each timing segment
+    # Create one overlay clip per spoken line
     for speaker, start_time, end_time in speaker_timings:
-        # Determine which PNG to use, dimensions, and position
-        if speaker == "peter":
-            png_path = peter_png_path
-            png_width = peter_width
-            png_height = peter_height
-            x_pos = 0  # bottom-left
-        elif speaker == "stewie":
-            png_path = stewie_png_path
-            png_width = stewie_width
-            png_height = stewie_height
-            x_pos = video_width - png_width  # bottom-right
-        else:
+        base_clip = char_clips.get(speaker)
+        if base_clip is None:
             continue  # Skip unknown speakers
 
-        y_pos = video_height - png_height  # bottom alignment for both
-
-        # Create ImageClip for this segment
-        img_clip = ImageClip(png_path, duration=end_time - start_time)
-        img_clip = img_clip.with_effects([vfx.Resize((png_width, png_height))])
-        img_clip = img_clip.with_start(start_time)
-        img_clip = img_clip.with_position((x_pos, y_pos))
-
-        overlay_clips.append(img_clip)
+        overlay_clips.append(
+            base_clip.with_duration(end_time - start_time).with_start(start_time)
+        )
 
     return overlay_clips
-
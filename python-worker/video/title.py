@@ -1,9 +1,18 @@
 """
 Title text rendering and formatting.
 """
+from functools import lru_cache
 from moviepy import TextClip
+from .fontcache import get_font
 
 
+@lru_cache(maxsize=4096)
+def measure_width(text: str, font_path: str, font_size: int) -> float:
+    """Advance width of a single line of text in pixels (cached)."""
+    return get_font(font_path, font_size).getlength(text)
+
+
+@lru_cache(maxsize=4096)
 def check_text_wraps(
     text: str,
     font_path: str,
@@ -15,6 +24,11 @@ def check_text_wraps(
     """
     Check if text wraps to multiple lines when rendered with given parameters.
     
+    MoviePy's caption layout breaks a line as soon as its bounding box is wider
+    than the clip, so measuring the whole string with the same font metrics
+    gives the same answer without rasterizing a TextClip. Results are cached,
+    since the same words and sizes come up again across captions and videos.
+    
     Args:
         text: Text to check
         font_path: Path to font file
@@ -26,20 +40,10 @@ def check_text_wraps(
     Returns:
         True if text wraps, False if it fits on one line.
     """
-    # Create temporary TextClip to check if text wraps
-    temp_clip = TextClip(
-        text=text,
-        font=font_path,
-        font_size=font_size,
-        method='caption',
-        size=(width, None),
-        text_align=text_align,
-        stroke_width=stroke_width
+    left, _, right, _ = get_font(font_path, font_size).getbbox(
+        text, stroke_width=stroke_width
     )
-    # Check if text contains newline (wrapped)
-    wraps = "\n" in temp_clip.text
-    temp_clip.close()  # Cleanup
-    return wraps
+    return right - left > width
 
 
 def format_title_text(
@@ -62,48 +66,22 @@ def format_title_text(
     Returns:
         Formatted title text with newlines at word boundaries
     """
-    title_words = title.upper().split()
-    built_text = ""
-    
-    for word in title_words:
-        # Try adding this word
-        test_text = built_text + (" " if built_text else "") + word
-        
-        # Create temporary clip to check if it wraps
-        temp_clip = TextClip(
-            text=test_text,
-            font=font_path,
-            font_size=font_size,
-            method='caption',
-            size=(text_width, None),
-            text_align='center',
-            stroke_width=stroke_width
-        )
-        
-        # Check if text wraps and where the newline occurs
-        rendered_text = temp_clip.text
-        temp_clip.close()
-        
-        # If text wraps, check if newline is in the middle of the current word
-        if "\n" in rendered_text:
-            # Split into lines
-            lines = rendered_text.split("\n")
-            last_line = lines[-1].strip()
-            
-            # Check if the word appears complete at the end of the last line
-            if last_line.endswith(word):
-                # Word fits completely at the end of new line, add it normally
-                built_text = test_text
-            else:
-                # Word is likely split - put newline before it to force word boundary
-                if built_text and not built_text.endswith("\n"):
-                    built_text = built_text.rstrip(" ")
-                built_text = built_text + ("\n" if not built_text.endswith("\n") else "") + word
+    # Accumulate word widths per line (each word measured once) and break
+    # before a word once the line plus stroke would no longer fit
+    space_width = measure_width(" ", font_path, font_size)
+    max_line_width = text_width - 2 * stroke_width
+    lines: list[str] = []
+    line_width = 0.0
+    for word in title.upper().split():
+        word_width = measure_width(word, font_path, font_size)
+        if lines and line_width + space_width + word_width <= max_line_width:
+            lines[-1] += " " + word
+            line_width += space_width + word_width
         else:
-            # No wrapping, add word normally
-            built_text = test_text
+            lines.append(word)
+            line_width = word_width
     
-    return built_text
+    return "\n".join(lines)
 
 
 def create_title_clip(
@@ -2,7 +2,7 @@
 Utility functions for video processing.
 """
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
 
 def get_run_id() -> str:
@@ -15,22 +15,32 @@ def ease_out_cubic(x: float) -> float:
     return 1 - (1 - x) ** 3
 
 
-def get_speaker_at_time(
-    speaker_timings: list[tuple[str, float, float]], 
-    time: float
-) -> Optional[str]:
+def annotate_speakers(
+    word_alignments: list[tuple[str, float, float]],
+    speaker_timings: list[tuple[str, float, float]]
+) -> Iterator[tuple[str, float, float, Optional[str]]]:
     """
-    Determine which speaker is speaking at a given time.
+    Attach the speaker to each word in a single merge sweep.
+    
+    Both lists must be in time order (as produced by the TTS and alignment
+    steps); each speaker segment is then visited once, O(words + segments).
     
     Args:
+        word_alignments: List of (word, start_time, end_time) tuples
         speaker_timings: List of (speaker, start_time, end_time) tuples
-        time: Time in seconds to check
         
-    Returns:
-        The speaker name if found, None otherwise.
+    Yields:
+        (word, start_time, end_time, speaker) tuples, speaker being None when
+        the word starts outside every segment
     """
-    for speaker, start, end in speaker_timings:
-        if start <= time < end:
-            return speaker
-    return None
-
+    si = 0
+    num_segments = len(speaker_timings)
+    for word, start, end in word_alignments:
+        # Skip segments that ended before this word starts
+        while si < num_segments and speaker_timings[si][2] <= start:
+            si += 1
+        if si < num_segments and speaker_timings[si][1] <= start:
+            speaker = speaker_timings[si][0]
+        else:
+            speaker = None
+        yield word, start, end, speaker